@@ -0,0 +1,228 @@
+# bench.py
+"""
+Parser benchmark suite.
+
+Generates synthetic HDFC-style statements (text and PDF) of varying page
+counts and layouts, then times:
+  - text:  parse_improved() on the extracted text alone
+  - api:   the full /api/parse pipeline through the Flask test client
+           (the result and page text caches are cleared before every request)
+  - early: early-exit extraction (parse_incremental) of multi-page PDFs;
+           "exited" counts the statements it finished before the last page
+
+Usage:
+  python bench.py                               # run and print a report
+  python bench.py --save bench_baseline.json    # store results as a baseline
+  python bench.py --compare bench_baseline.json # flag regressions against it
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import main
+
+LAYOUTS = ("summary_table", "labels_inline", "labels_below")
+PAGE_COUNTS = (1, 5, 20)
+ROWS_PER_PAGE = 45
+MERCHANTS = ["AMAZON", "SWIGGY", "UBER", "ZOMATO", "BIGBASKET", "FLIPKART", "IRCTC", "NEFT PAYMENT", "FUEL SURCHARGE"]
+CITIES = ["MUMBAI", "BANGALORE", "DELHI", "PUNE", "CHENNAI", ""]
+
+# -------------------- Synthetic statements --------------------
+def _money(rng, low=10, high=250_000):
+    return f"{rng.uniform(low, high):,.2f}"
+
+def _date(rng):
+    return f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024"
+
+def _summary_lines(rng, layout):
+    card = f"{rng.randint(4000, 4999)} XXXX XXXX {rng.randint(1000, 9999)}"
+    opening, payments, purchases, finance = (_money(rng) for _ in range(4))
+    total, minimum, limit, available = _money(rng), _money(rng, 100, 5_000), _money(rng, 100_000, 900_000), _money(rng)
+    head = ["HDFC Bank Credit Card Statement", f"Card No: {card}", f"Statement Date : {_date(rng)}"]
+    if layout == "summary_table":
+        return head + [
+            "Payment Due Date Total Dues Minimum Amount Due",
+            f"{_date(rng)} Rs. {total} Rs. {minimum}",
+            "Credit Limit Available Credit Limit Available Cash Limit",
+            f"{limit} {available} {_money(rng)}",
+            "Account Summary",
+            "Opening Balance Payment/Credits Purchase/Debits Finance Charges Total Dues",
+            f"{opening} {finance} {purchases} {payments} {total}",
+        ]
+    pairs = [
+        ("Payment Due Date", _date(rng)), ("Total Amount Due", f"Rs. {total}"),
+        ("Minimum Amount Due", f"Rs. {minimum}"), ("Credit Limit", limit),
+        ("Available Credit", available), ("Previous Balance", opening),
+        ("Payments, Credits", payments), ("Purchases", purchases), ("Interest Charged", finance),
+    ]
+    if layout == "labels_inline":
+        return head + [f"{label}: {value}" for label, value in pairs]
+    lines = list(head)
+    for label, value in pairs:
+        lines += [label, value]
+    return lines
+
+def _transaction_lines(rng, n):
+    lines = ["Domestic Transactions", "Date Transaction Description Amount (in Rs.)"]
+    for _ in range(n):
+        suffix = " Cr" if rng.random() < 0.1 else ""
+        lines.append(f"{_date(rng)} {rng.choice(MERCHANTS)} {rng.choice(CITIES)} {_money(rng, 10, 50_000)}{suffix}".replace("  ", " "))
+    return lines
+
+def synthetic_statement(pages, layout, seed=0):
+    """Return a list of pages, each a list of text lines."""
+    rng = random.Random(f"{layout}:{pages}:{seed}")
+    first = _summary_lines(rng, layout)
+    out = [first + _transaction_lines(rng, max(0, ROWS_PER_PAGE - len(first)))]
+    for _ in range(pages - 1):
+        out.append(_transaction_lines(rng, ROWS_PER_PAGE))
+    return out
+
+def _pdf_escape(line):
+    line = line.encode("latin-1", "replace").decode("latin-1")
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def render_pdf(pages):
+    """Render pages of text lines into a minimal single-font PDF (no dependencies)."""
+    objects = [b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    pages_id = 2 + 2 * len(pages)
+    for lines in pages:
+        ops = ["BT /F1 9 Tf 36 806 Td 11 TL"] + [f"({_pdf_escape(ln)}) Tj T*" for ln in lines] + ["ET"]
+        stream = "\n".join(ops).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+                       b"/Resources << /Font << /F1 1 0 R >> >> >>" % (pages_id, len(objects)))
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects.append(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids)))
+    objects.append(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, len(objects), xref)
+    return bytes(out)
+
+# -------------------- Measurement --------------------
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+def _measure(fn, inputs, repeat):
+    timings = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for item in inputs:
+            t0 = time.perf_counter()
+            fn(item)
+            timings.append(time.perf_counter() - t0)
+    total = time.perf_counter() - started
+    # tracemalloc slows allocation-heavy code a lot, so peak memory is taken
+    # in a separate, untimed pass
+    tracemalloc.start()
+    for item in inputs:
+        fn(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "runs": len(timings),
+        "throughput_per_s": round(len(timings) / total, 2) if total else None,
+        "p50_ms": round(_percentile(timings, 50) * 1000, 3),
+        "p95_ms": round(_percentile(timings, 95) * 1000, 3),
+        "peak_mem_kb": round(peak / 1024, 1),
+    }
+
+def _api_parse(client, pdf_bytes):
+    main.parse_cache.clear()
+    main.page_cache.clear()
+    resp = client.post("/api/parse", data={"file": (io.BytesIO(pdf_bytes), "statement.pdf")})
+    if resp.status_code != 200:
+        raise RuntimeError(f"/api/parse returned {resp.status_code}: {resp.get_data(as_text=True)[:200]}")
+
+def _early_parse(pdf_bytes):
+    main.page_cache.clear()
+    return main.parse_incremental(pdf_bytes, parallel=False)[0]
+
+def run(page_counts=PAGE_COUNTS, layouts=LAYOUTS, docs=3, repeat=3, include_api=True):
+    client = main.app.test_client()
+    results = {}
+    for layout in layouts:
+        for pages in page_counts:
+            statements = [synthetic_statement(pages, layout, seed) for seed in range(docs)]
+            pdfs = [render_pdf(st) for st in statements]
+            texts = [main.extract_pdf_text(pdf) for pdf in pdfs]
+            results[f"text/{layout}/{pages}p"] = _measure(main.parse_improved, texts, repeat)
+            if include_api:
+                results[f"api/{layout}/{pages}p"] = _measure(lambda pdf: _api_parse(client, pdf), pdfs, repeat)
+            if pages > 1:
+                case = results[f"early/{layout}/{pages}p"] = _measure(_early_parse, pdfs, repeat)
+                exited = sum(len(_early_parse(pdf)) < len(text) for pdf, text in zip(pdfs, texts))
+                case["exited"] = f"{exited}/{len(pdfs)}"
+    return results
+
+def compare(results, baseline, threshold):
+    """Return a list of (case, metric, baseline, current, ratio) regressions."""
+    regressions = []
+    for case, cur in results.items():
+        base = baseline.get(case)
+        if not base:
+            continue
+        for metric in ("p50_ms", "p95_ms", "peak_mem_kb"):
+            if base.get(metric) and cur[metric] > base[metric] * (1 + threshold):
+                regressions.append((case, metric, base[metric], cur[metric], round(cur[metric] / base[metric], 2)))
+    return regressions
+
+def print_report(results):
+    print(f"{'case':36} {'runs':>5} {'ops/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'peak KB':>9} {'exited':>7}")
+    for case, r in results.items():
+        print(f"{case:36} {r['runs']:>5} {r['throughput_per_s']:>9} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['peak_mem_kb']:>9} {r.get('exited', ''):>7}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark statement parsing.")
+    parser.add_argument("--pages", type=int, nargs="+", default=list(PAGE_COUNTS))
+    parser.add_argument("--layouts", nargs="+", choices=LAYOUTS, default=list(LAYOUTS))
+    parser.add_argument("--docs", type=int, default=3, help="distinct statements per case")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--text-only", action="store_true", help="skip the /api/parse pipeline")
+    parser.add_argument("--save", help="write results to this JSON baseline")
+    parser.add_argument("--compare", help="compare against this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before flagging (0.25 = 25%%)")
+    parser.add_argument("--write-samples", help="also write the generated PDFs to this directory")
+    args = parser.parse_args()
+
+    if args.write_samples:
+        os.makedirs(args.write_samples, exist_ok=True)
+        for layout in args.layouts:
+            for pages in args.pages:
+                with open(os.path.join(args.write_samples, f"{layout}_{pages}p.pdf"), "wb") as f:
+                    f.write(render_pdf(synthetic_statement(pages, layout)))
+
+    results = run(args.pages, args.layouts, args.docs, args.repeat, include_api=not args.text_only)
+    print_report(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for case, metric, base, cur, ratio in regressions:
+            print(f"REGRESSION {case} {metric}: {base} -> {cur} ({ratio}x)")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline.")
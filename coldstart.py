@@ -0,0 +1,132 @@
+# coldstart.py
+"""
+Cold-start check for serverless deployment.
+
+For every route, a fresh interpreter imports main and serves one request
+through the Flask test client. The report gives the import time, the first
+request's time and the number of modules main loaded for that route. The
+script exits non-zero when the import exceeds the time budget or a route
+loads a module it must not (pdfplumber for /health and /api/insights).
+
+/api/insights talks to a local stub of the Gemini API, so the full request
+path runs without network access.
+
+Usage:
+  python coldstart.py                    # report, default 250 ms import budget
+  python coldstart.py --budget-ms 200 --runs 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import bench
+
+ROUTES = ("health", "insights", "metrics", "analytics", "parse")
+# modules a route must not import
+FORBIDDEN = {
+    "health": ("pdfplumber", "pdfminer", "requests", "pandas", "pytesseract"),
+    "insights": ("pdfplumber", "pdfminer", "pandas", "pytesseract"),
+    "metrics": ("pdfplumber", "pdfminer", "requests", "pandas", "pytesseract"),
+    "analytics": ("pdfplumber", "pdfminer", "requests", "pytesseract"),
+    "parse": ("requests", "pandas", "pytesseract"),
+}
+
+CHILD = r'''
+import io, json, sys, threading, time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+class Gemini(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps({"candidates": [{"content": {"parts": [{"text": "ok"}]}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+route, pdf_path = sys.argv[1], sys.argv[2]
+stub = HTTPServer(("127.0.0.1", 0), Gemini)
+threading.Thread(target=stub.serve_forever, daemon=True).start()
+import os
+os.environ.update(GEMINI_API_KEY="coldstart", GEMINI_API_BASE=f"http://127.0.0.1:{stub.server_port}")
+
+before = set(sys.modules)
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+imported = len(set(sys.modules) - before)
+client = main.app.test_client()
+statement = {"Total Balance Due": "1,234.00", "Purchases": "900.00", "Credit Access Line": "50,000.00",
+             "Interest Charged": "12.00", "Billing Cycle Dates": "01/01/2024 - 31/01/2024"}
+if route == "health":
+    resp = client.get("/health")
+elif route == "metrics":
+    resp = client.get("/metrics")
+elif route == "insights":
+    resp = client.post("/api/insights", json={"extractedData": statement, "budgetGoal": "500"})
+elif route == "analytics":
+    resp = client.post("/api/analytics", json={"statements": [dict(statement, month="2024-01")]})
+else:
+    with open(pdf_path, "rb") as f:
+        resp = client.post("/api/parse", data={"file": (io.BytesIO(f.read()), "statement.pdf")})
+t2 = time.perf_counter()
+loaded = set(sys.modules) - before
+print(json.dumps({
+    "status": resp.status_code,
+    "import_ms": (t1 - t0) * 1000,
+    "request_ms": (t2 - t1) * 1000,
+    "import_modules": imported,
+    "modules": len(loaded),
+    "top_level": sorted({m.split(".")[0] for m in loaded}),
+}))
+'''
+
+def measure(route, pdf_path):
+    env = dict(os.environ)
+    out = subprocess.run([sys.executable, "-c", CHILD, route, pdf_path], capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)), env=env)
+    if out.returncode != 0:
+        raise RuntimeError(f"{route}: child failed\n{out.stderr}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main(routes, runs, budget_ms, pdf_path):
+    failures = []
+    print(f"{'route':10} {'status':>6} {'import ms':>9} {'1st req ms':>10} {'modules':>8} {'+request':>8}  heavy")
+    for route in routes:
+        samples = [measure(route, pdf_path) for _ in range(runs)]
+        best = min(samples, key=lambda r: r["import_ms"] + r["request_ms"])
+        heavy = [m for m in ("pdfplumber", "pdfminer", "requests", "pandas", "numpy") if m in best["top_level"]]
+        print(f"{route:10} {best['status']:>6} {best['import_ms']:>9.1f} {best['request_ms']:>10.1f} "
+              f"{best['import_modules']:>8} {best['modules'] - best['import_modules']:>8}  {','.join(heavy) or '-'}")
+        if best["status"] >= 500:
+            failures.append(f"{route} returned {best['status']}")
+        for mod in FORBIDDEN.get(route, ()):
+            if mod in best["top_level"]:
+                failures.append(f"{route} imported {mod}")
+        if best["import_ms"] > budget_ms:
+            failures.append(f"{route}: import took {best['import_ms']:.1f} ms (budget {budget_ms} ms)")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return not failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure cold-start import time and modules per route.")
+    parser.add_argument("--routes", nargs="+", choices=ROUTES, default=list(ROUTES))
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per route; the fastest is reported")
+    parser.add_argument("--budget-ms", type=float, default=250, help="import time budget for main")
+    args = parser.parse_args()
+
+    import tempfile
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(bench.render_pdf(bench.synthetic_statement(1, "summary_table")))
+    try:
+        ok = main(args.routes, args.runs, args.budget_ms, f.name)
+    finally:
+        os.remove(f.name)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,58 @@
+# gunicorn.conf.py
+"""
+Production server settings, read automatically by `gunicorn main:app` when
+started from the repository root.
+
+- One worker process per CPU (WEB_CONCURRENCY), each with a few threads so
+  slow Gemini calls don't block parsing.
+- The app is imported and warmed up once in the master (preload_app), so
+  every forked worker starts with pdfplumber, font metrics and the parser
+  rules already loaded.
+- On SIGTERM a worker stops accepting connections, finishes its in-flight
+  requests, then drains queued async parse jobs, all within
+  graceful_timeout.
+"""
+import multiprocessing
+import os
+import tempfile
+
+# Every worker already has a core of its own, so a request's pages are
+# extracted in-process instead of through a per-worker process pool.
+os.environ.setdefault("PDF_EXTRACT_WORKERS", "1")
+# Likewise one OCR process per worker, so a server never runs more tesseract
+# processes than it has workers.
+os.environ.setdefault("OCR_WORKERS", "1")
+# Async job status has to be visible whichever worker the poll lands on.
+os.environ.setdefault("PARSE_JOB_DB", os.path.join(tempfile.gettempdir(), f"parse_jobs-{os.getpid()}.db"))
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+def when_ready(server):
+    if preload_app:
+        import main
+        server.log.info("Warm-up done in %.3fs", main.warm_up())
+
+def post_worker_init(worker):
+    if not preload_app:
+        import main
+        worker.log.info("Warm-up done in %.3fs", main.warm_up())
+
+def worker_exit(server, worker):
+    import main
+    main.shutdown(timeout=server.cfg.graceful_timeout)
+
+def on_exit(server):
+    db_path = os.environ.get("PARSE_JOB_DB")
+    if db_path and db_path.endswith(f"parse_jobs-{os.getpid()}.db"):
+        for suffix in ("", "-journal"):
+            try:
+                os.remove(db_path + suffix)
+            except OSError:
+                pass
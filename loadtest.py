@@ -0,0 +1,116 @@
+# loadtest.py
+"""
+Throughput scaling test for the production server.
+
+Starts `gunicorn main:app` (with gunicorn.conf.py) once per worker count,
+with the parse and page caches disabled so every request does the full
+extract + parse, then fires concurrent /api/parse uploads of synthetic
+statements for a fixed duration and reports requests/s, latency and the
+speed-up over a single worker.
+
+Usage:
+  python loadtest.py                       # 1, 2, 4, ... up to the CPU count
+  python loadtest.py --workers 1 4 8 --pages 5 --duration 20
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+import bench
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(workers, port):
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(port),
+               PARSE_CACHE_MAX_ENTRIES="0", PAGE_CACHE_MAX_ENTRIES="0")
+    env.pop("PARSE_CACHE_DB", None)
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {proc.returncode}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).ok:
+                return proc
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("gunicorn did not become healthy within 60s")
+
+def run_load(port, pdfs, clients, duration):
+    url = f"http://127.0.0.1:{port}/api/parse"
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(n):
+        session = requests.Session()
+        i = n
+        while time.perf_counter() < stop_at:
+            t0 = time.perf_counter()
+            try:
+                resp = session.post(url, files={"file": ("statement.pdf", pdfs[i % len(pdfs)])}, timeout=120)
+                ok = resp.status_code == 200
+            except requests.RequestException:
+                ok = False
+            with lock:
+                if ok:
+                    latencies.append(time.perf_counter() - t0)
+                else:
+                    errors[0] += 1
+            i += clients
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(bench._percentile(latencies, 50) * 1000, 1) if latencies else None,
+        "p95_ms": round(bench._percentile(latencies, 95) * 1000, 1) if latencies else None,
+    }
+
+def main(worker_counts, pages, duration, clients_per_worker):
+    pdfs = [bench.render_pdf(bench.synthetic_statement(pages, layout, seed))
+            for layout in bench.LAYOUTS for seed in range(4)]
+    print(f"{'workers':>7} {'clients':>7} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'speed-up':>8}")
+    base = None
+    for workers in worker_counts:
+        port = _free_port()
+        proc = start_server(workers, port)
+        try:
+            clients = workers * clients_per_worker
+            r = run_load(port, pdfs, clients, duration)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=60)
+        base = base or r["rps"]
+        speedup = round(r["rps"] / base, 2) if base else None
+        print(f"{workers:>7} {clients:>7} {r['requests']:>8} {r['errors']:>6} {r['rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {speedup:>8}")
+
+if __name__ == "__main__":
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({1, *[2 ** i for i in range(1, cpus.bit_length()) if 2 ** i <= cpus], cpus})
+    parser = argparse.ArgumentParser(description="Measure /api/parse throughput across gunicorn worker counts.")
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    parser.add_argument("--pages", type=int, default=5, help="pages per synthetic statement")
+    parser.add_argument("--duration", type=float, default=15, help="seconds of load per worker count")
+    parser.add_argument("--clients-per-worker", type=int, default=2)
+    args = parser.parse_args()
+    main(args.workers, args.pages, args.duration, args.clients_per_worker)
@@ -1,153 +1,783 @@
 # main.py
-from flask import Flask, request, jsonify
+from flask import Flask, Request, request, jsonify, Response, stream_with_context, g, has_request_context
 from flask_cors import CORS
-import pdfplumber
 import re
 import io
-import requests
 import time
 import os
 import json
-from dotenv import load_dotenv
+import sys
+import zipfile
+import zlib
+import hashlib
+import sqlite3
+import threading
+import queue
+import uuid
+import random
+import mmap
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from decimal import Decimal, Context, ROUND_HALF_EVEN
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from werkzeug.exceptions import RequestEntityTooLarge
 
-load_dotenv()
+# Heavy dependencies are imported by the first function that needs them, not
+# here: pdfplumber/pdfminer (open_pdf, page_cache_key), requests (the Gemini
+# client), the process pool (extraction and batch), argparse (CLI) and
+# pandas/pyarrow. /health and /api/insights never load pdfplumber, and a cold
+# start only pays for Flask. Check with `python coldstart.py`.
+def _load_dotenv():
+    """
+    Load the nearest .env from this file's directory upwards, as
+    load_dotenv() does, but import python-dotenv only if there is one.
+    """
+    path = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        candidate = os.path.join(path, ".env")
+        if os.path.isfile(candidate):
+            from dotenv import load_dotenv
+            load_dotenv(candidate)
+            return
+        parent = os.path.dirname(path)
+        if parent == path:
+            return
+        path = parent
+
+_load_dotenv()
 
 app = Flask(__name__)
 CORS(app)
 
+# -------------------- Metrics --------------------
+# Minimal Prometheus-style registry. Stage timings are recorded with span();
+# counters that already live elsewhere (caches, Gemini, pools) are read at
+# scrape time by render_metrics(). With SERVER_TIMING=1 every response also
+# carries a Server-Timing header listing the spans of that request.
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in labels)
+    return "{" + inner + "}"
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}  # sorted label items -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        for key, series in sorted(items):
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', bound),))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency by endpoint.")
+STAGE_SECONDS = Histogram("parse_stage_duration_seconds", "Latency of /api/parse pipeline stages.")
+PAGE_SECONDS = Histogram("pdf_page_extract_duration_seconds", "pdfplumber extract_text() latency per page.")
+JOB_SECONDS = Histogram("parse_job_duration_seconds", "Async parse job time spent queued and running.")
+RULE_SECONDS = Histogram("parse_rule_duration_seconds", "Latency of each field rule inside parse_improved.",
+                         buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5))
+
+@contextmanager
+def span(stage):
+    """Time a pipeline stage into STAGE_SECONDS (and Server-Timing, if on)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if SERVER_TIMING and has_request_context():
+            g.setdefault("server_timing", []).append((stage, elapsed))
+
+class _RuleClock:
+    """Records the time since the previous lap under the given rule name."""
+    __slots__ = ("last",)
+
+    def __init__(self):
+        self.last = time.perf_counter()
+
+    def lap(self, rule):
+        now = time.perf_counter()
+        RULE_SECONDS.observe(now - self.last, rule=rule)
+        self.last = now
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _record_request_timing(response):
+    started = g.get("request_started")
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        REQUEST_SECONDS.observe(elapsed, endpoint=request.endpoint or "unknown", status=response.status_code)
+        if SERVER_TIMING:
+            entries = [f"{name};dur={secs * 1000:.2f}" for name, secs in g.get("server_timing", [])]
+            entries.append(f"total;dur={elapsed * 1000:.2f}")
+            response.headers["Server-Timing"] = ", ".join(entries)
+    return response
+
+# -------------------- Uploads --------------------
+# Uploads are hashed as they stream in and spooled to a named temp file once
+# they pass UPLOAD_SPOOL_THRESHOLD. Large PDFs are then memory-mapped for
+# pdfplumber (and opened by path in pool workers) instead of being copied
+# into a bytes object. Requests larger than MAX_UPLOAD_MB are rejected with
+# a 413 before the body is read; the batch endpoint takes up to
+# BATCH_MAX_UPLOAD_MB per request and holds each PDF in it, zip members
+# included, to MAX_UPLOAD_MB.
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "25")) * 1024 * 1024)
+BATCH_MAX_UPLOAD_BYTES = int(float(os.getenv("BATCH_MAX_UPLOAD_MB", "500")) * 1024 * 1024)
+UPLOAD_SPOOL_THRESHOLD = int(os.getenv("UPLOAD_SPOOL_THRESHOLD", str(1024 * 1024)))
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
+
+def _format_mb(n):
+    return f"{round(n / (1024 * 1024), 2):g}MB"
+
+class UploadSpool(io.RawIOBase):
+    """
+    Writable, seekable upload buffer used as the multipart file stream.
+    Keeps the data in memory up to `threshold` bytes, then moves it to a
+    named temp file that is deleted on close. `sha256` is updated as the
+    bytes are written.
+    """
+
+    def __init__(self, threshold):
+        super().__init__()
+        self.threshold = threshold
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.path = None
+        self._fp = io.BytesIO()
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def write(self, b):
+        self.sha256.update(b)
+        self.size += len(b)
+        if self.path is None and self.size > self.threshold:
+            self._rollover()
+        return self._fp.write(b)
+
+    def _rollover(self):
+        fp = tempfile.NamedTemporaryFile(prefix="upload-", suffix=".pdf", delete=False)
+        fp.write(self._fp.getbuffer())
+        self._fp = fp
+        self.path = fp.name
+
+    def readinto(self, b):
+        return self._fp.readinto(b)
+
+    def read(self, size=-1):
+        return self._fp.read(size)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._fp.seek(offset, whence)
+
+    def tell(self):
+        return self._fp.tell()
+
+    def flush(self):
+        self._fp.flush()
+
+    def source(self):
+        """The PDF source for the extraction helpers: a temp file path or bytes."""
+        if self.path is not None:
+            self._fp.flush()
+            return self.path
+        return self._fp.getvalue()
+
+    def close(self):
+        if not self.closed:
+            self._fp.close()
+            if self.path is not None:
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+        super().close()
+
+class SpoolingRequest(Request):
+    @property
+    def max_content_length(self):
+        if self.endpoint == "parse_batch":
+            return BATCH_MAX_UPLOAD_BYTES
+        return super().max_content_length
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadSpool(UPLOAD_SPOOL_THRESHOLD)
+
+app.request_class = SpoolingRequest
+
+@app.errorhandler(413)
+def _upload_too_large(e):
+    limit = request.max_content_length or MAX_UPLOAD_BYTES
+    return jsonify({"error": f"File too large. The limit is {_format_mb(limit)}."}), 413
+
+def upload_source(file):
+    """Return (pdf source, sha256 hex digest) for an uploaded FileStorage."""
+    stream = file.stream
+    if isinstance(stream, UploadSpool):
+        return stream.source(), stream.sha256.hexdigest()
+    data = file.read()
+    return data, hashlib.sha256(data).hexdigest()
+
+@contextmanager
+def open_pdf(source):
+    """Open a PDF given as bytes or as a file path (memory-mapped)."""
+    import pdfplumber
+    if isinstance(source, (bytes, bytearray)):
+        with pdfplumber.open(io.BytesIO(source)) as pdf:
+            yield pdf
+        return
+    with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with pdfplumber.open(mm) as pdf:
+            yield pdf
+
+# -------------------- Compiled rule table --------------------
+# Every pattern the parser uses is compiled once at import time. Line rules are
+# evaluated in a single pass over the document lines by _scan_lines(); text
+# rules are only run against the full text when a field is still missing.
+_RE_NOISE_CODES = re.compile(r"\b(AAN|ANN|A/\w+)\b", re.IGNORECASE)
+_RE_WHITESPACE = re.compile(r"\s+")
+_RE_NEWLINE = re.compile(r"\n")
+_RE_PAREN_NUMBER = re.compile(r"\(([\d,\.]+)\)")
+_RE_RUPEE = re.compile(r"(₹|Rs\.?|INR)")
+_RE_USD = re.compile(r"(\$|USD|US\$)")
+_RE_NUMERIC_PART = re.compile(r"(-?\d{1,3}(?:[,0-9]*)(?:\.\d+)?|-?\d+\.\d+)")
+_RE_NON_NUMERIC = re.compile(r"[^\d\.\,\-\(\)₹Rs\$]")
+_RE_LEADING_MINUS = re.compile(r"^-+")
+
+_MONEY_PATTERN = r"(?:₹|Rs\.?|INR|\$)?\s*-?\d{1,3}(?:[,\d]{0,})?(?:\.\d+)?"
+_RE_MONEY = re.compile(_MONEY_PATTERN)
+_RE_MONEY_I = re.compile(_MONEY_PATTERN, re.IGNORECASE)
+_RE_LONG_NUMBER = re.compile(r"\b\d{4,}\b")
+
+_RE_NUMERIC_DATE = re.compile(r"\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}")
+_RE_WORD_DATE = re.compile(r"[A-Za-z]{3,9}\s+\d{1,2},\s*\d{4}")
+_RE_LAST4 = re.compile(r"(\d{4})\b")
+_RE_ANY4 = re.compile(r"\b(\d{4})\b")
+
+# (name, pattern, first_only) -- first_only rules stop being tested after
+# their first hit, the rest collect every matching line index in order.
+_LINE_RULES = [
+    ("card", re.compile(r"\b(card|card no|card number|account number|ending in|ending)\b", re.IGNORECASE), False),
+    ("billing", re.compile(r"(Statement Date|Statement Period|Billing Cycle)", re.IGNORECASE), True),
+    ("due_date", re.compile(r"Payment\s*Due\s*Date", re.IGNORECASE), True),
+    ("due_hint", re.compile(r"(Total\s+Dues|Minimum\s+Payment|Minimum\s+Amount)", re.IGNORECASE), False),
+    ("summary", re.compile(r"Account\s+Summary|Opening\s+Payment\/\s*Purchase\/\s*Finance|Opening\s+Balance.*Payments.*Purchase", re.IGNORECASE), False),
+    ("total_dues", re.compile(r"(Total\s+Dues|Total\s+Amount\s+Due|Amount\s+Payable|Outstanding\s+Balance)", re.IGNORECASE), False),
+]
+
+_RE_AVAILABLE_CREDIT = re.compile(r"Available\s+(?:Credit|Credit\s+Limit)[:\s]*₹?\s*([\d,\.]+)", re.IGNORECASE)
+_RE_TOTAL_DUE_TEXT = re.compile(r"(?:Total\s+Dues|Total\s+Amount\s+Due|Outstanding\s+Amount|Amount\s+Payable)[:\s]*₹?\s*([\d,\,\.]+)", re.IGNORECASE)
+_RE_PAYMENTS_CREDITS = re.compile(r"Payments[,\s]+Credits[:\s]*₹?\s*([\d,\,\.]+)", re.IGNORECASE)
+_RE_PAYMENTS = re.compile(r"Payments\s*[:\s]*₹?\s*([\d,\,\.]+)", re.IGNORECASE)
+_RE_MINIMUM_DUE = re.compile(r"Minimum\s+(?:Amount|Payment)\s+Due[:\s]*₹?\s*([\d,\,\.]+)", re.IGNORECASE)
+_RE_SNIPPET_AMOUNT = re.compile(r"₹?\s*([\d,\,\.]+)")
+
+# Fields filled by label proximity, in resolution order.
+_LABEL_RULES = [
+    ("Credit Access Line", [re.compile(p, re.IGNORECASE) for p in (r"Credit\s+Limit", r"Credit\s+Access\s+Line", r"Credit\s+Line")]),
+    ("Available Credit", [re.compile(p, re.IGNORECASE) for p in (r"Available\s+Credit", r"Available\s+Limit", r"Available\s+Credit\s+Limit")]),
+    ("Minimum Payment Due", [re.compile(p, re.IGNORECASE) for p in (r"Minimum\s+(?:Payment|Amount)\s+Due", r"\bMin\s+Payment\b")]),
+    ("Interest Charged", [re.compile(p, re.IGNORECASE) for p in (r"Interest\s+Charged", r"Finance\s+Charges?", r"\bInterest\b")]),
+    ("Purchases", [re.compile(p, re.IGNORECASE) for p in (r"\bPurchases\b", r"Purchase\s*\/\s*Debits")]),
+    ("Previous Balance", [re.compile(p, re.IGNORECASE) for p in (r"Previous\s+Balance", r"Opening\s+Balance")]),
+]
+
+# Labels the layout-aware mode (parse_layout) resolves by position, as
+# (field, value kind, patterns). They are claimed in this order and a word
+# belongs to one label only, so "Available Credit Limit" is taken before
+# "Credit Limit" can match inside it.
+_LAYOUT_LABELS = [
+    (field, kind, [re.compile(p, re.IGNORECASE) for p in patterns]) for field, kind, patterns in (
+        ("Available Credit", "amount", (r"Available\s+Credit(?:\s+Limit)?", r"Available\s+Limit")),
+        ("Credit Access Line", "amount", (r"Credit\s+(?:Access\s+)?(?:Limit|Line)",)),
+        ("Minimum Payment Due", "amount", (r"Minimum\s+(?:Payment|Amount)\s+Due", r"\bMin\s+Payment\b")),
+        ("Payment Due Date", "date", (r"Payment\s+Due\s+Date", r"\bDue\s+Date\b")),
+        ("Total Balance Due", "amount", (r"Total\s+(?:Dues|Amount\s+Due|Balance\s+Due)", r"New\s+Balance", r"Amount\s+Payable", r"Outstanding\s+Amount")),
+        ("Previous Balance", "amount", (r"Previous\s+Balance", r"Opening\s+Balance")),
+        ("Payments, Credits", "amount", (r"Payments?\s*(?:[,/]|,?\s+and\s+Other)?\s*Credits?",)),
+        ("Purchases", "amount", (r"\bPurchases?(?:\s*/\s*Debits)?\b",)),
+        ("Interest Charged", "amount", (r"Interest\s+Charged", r"Finance\s+Charges?")),
+    )
+]
+
+_RE_STRIP_TO_NUMBER = re.compile(r"[^\d\.]")
+_RE_HAS_DIGIT = re.compile(r"\d")
+_RE_SINGLE_LETTER = re.compile(r"[A-Za-z]")
+
+# -------------------- Issuer profiles --------------------
+# A profile bundles the rule set parse_improved runs for one issuer's layout:
+# line rules, the Account Summary column order, label rules, an optional APR
+# rule and page hints (the last page each summary field is expected on, used
+# as the early-exit page cap). An explicit `issuer` picks its profile
+# directly; otherwise fingerprint_issuer() chooses one from the first page's
+# text, falling back to the generic profile (the original HDFC-tuned rules).
+_HDFC_SUMMARY_COLUMNS = ("Previous Balance", "Interest Charged", "Purchases", "Payments, Credits", "Total Balance Due")
+
+class IssuerProfile:
+    """
+    Rule set for one issuer. line_rules must provide the card, billing,
+    due_date, due_hint and total_dues rules, plus summary when
+    summary_columns is set. layout_labels is used by the layout-aware mode.
+    """
+
+    def __init__(self, key, name, aliases=(), fingerprints=(), line_rules=_LINE_RULES,
+                 summary_columns=_HDFC_SUMMARY_COLUMNS, label_rules=_LABEL_RULES, apr_rule=None, page_hints=None,
+                 month_first=False, layout_labels=_LAYOUT_LABELS):
+        self.key = key
+        self.name = name
+        self.aliases = tuple(aliases)
+        self.fingerprints = [re.compile(p, re.IGNORECASE) for p in fingerprints]
+        self.line_rules = line_rules
+        self.summary_columns = summary_columns
+        self.label_rules = label_rules
+        self.apr_rule = apr_rule
+        self.page_hints = page_hints or {}
+        # numeric dates are mm/dd rather than dd/mm (used by /api/analytics)
+        self.month_first = month_first
+        self.layout_labels = layout_labels
+
+    def __repr__(self):
+        return f"IssuerProfile({self.key!r})"
+
+ISSUER_PROFILES = OrderedDict()
+_issuer_aliases = {}
+_fingerprint_re = None
+
+def _issuer_alias(name):
+    # "CFPB Sample (Working)" -> "cfpb sample"
+    name = re.sub(r"\(.*?\)", "", name or "")
+    return _RE_WHITESPACE.sub(" ", name).strip().lower()
+
+def register_issuer_profile(profile):
+    """Add (or replace) a profile and rebuild the fingerprint matcher."""
+    global _fingerprint_re
+    ISSUER_PROFILES[profile.key] = profile
+    for alias in (profile.key, profile.name) + profile.aliases:
+        _issuer_aliases[_issuer_alias(alias)] = profile
+    # one alternation over every fingerprint so the first page is scanned once;
+    # group names map back to (profile key, fingerprint index)
+    parts = [f"(?P<{key}__{i}>{rg.pattern})"
+             for key, p in ISSUER_PROFILES.items() for i, rg in enumerate(p.fingerprints)]
+    _fingerprint_re = re.compile("|".join(parts), re.IGNORECASE) if parts else None
+    return profile
+
+GENERIC_PROFILE = register_issuer_profile(IssuerProfile("generic", "Generic"))
+
+register_issuer_profile(IssuerProfile(
+    "hdfc", "HDFC Bank", aliases=("hdfc bank credit card",),
+    fingerprints=(r"HDFC\s+Bank", r"hdfcbank\.com"),
+    page_hints={field: 1 for field in (
+        "Total Balance Due", "Payment Due Date", "Minimum Payment Due", "Card Last 4 Digits",
+        "Billing Cycle Dates", "Previous Balance", "Payments, Credits", "Purchases",
+        "Interest Charged", "Credit Access Line", "Available Credit")},
+))
+
+# CFPB sample statements list the account summary as "label  amount" lines,
+# so the HDFC column-row mapping is skipped; New Balance is the total due.
+register_issuer_profile(IssuerProfile(
+    "cfpb", "CFPB Sample", aliases=("cfpb",),
+    fingerprints=(r"consumerfinance\.gov", r"New\s+Balance", r"Credit\s+Access\s+Line"),
+    line_rules=[("billing", re.compile(r"(Opening\s*/\s*Closing\s+Date|Statement Date|Billing Cycle)", re.IGNORECASE), True)]
+               + [r for r in _LINE_RULES if r[0] not in ("billing", "summary")],
+    summary_columns=None,
+    label_rules=[
+        ("Total Balance Due", [re.compile(r"New\s+Balance", re.IGNORECASE)]),
+        ("Payments, Credits", [re.compile(r"Payments,?\s+(?:and\s+Other\s+)?Credits", re.IGNORECASE)]),
+    ] + _LABEL_RULES,
+    apr_rule=re.compile(r"Annual\s+Percentage\s+Rate.*?Purchases?.*?(\d+(?:\.\d+)?)\s*%", re.IGNORECASE | re.DOTALL),
+    page_hints={
+        "Total Balance Due": 1, "Payment Due Date": 1, "Minimum Payment Due": 1, "Card Last 4 Digits": 1,
+        "Previous Balance": 1, "Payments, Credits": 1, "Purchases": 1, "Interest Charged": 1,
+        "Credit Access Line": 1, "Available Credit": 1, "Billing Cycle Dates": 1, "Annual Percentage Rate": 3,
+    },
+    month_first=True,
+))
+
+def resolve_issuer(name):
+    """
+    Return the profile for an explicit issuer name, or None when the issuer
+    should be detected (missing, empty or "AUTO"). Unknown names get the
+    generic profile.
+    """
+    alias = _issuer_alias(name)
+    if alias in ("", "auto"):
+        return None
+    return _issuer_aliases.get(alias, GENERIC_PROFILE)
+
+def fingerprint_issuer(first_page_text, limit=4000):
+    """Pick the profile whose fingerprints best match the start of the first page."""
+    if not first_page_text or _fingerprint_re is None:
+        return GENERIC_PROFILE
+    seen = set()
+    for m in _fingerprint_re.finditer(first_page_text[:limit]):
+        seen.add(m.lastgroup)
+    if not seen:
+        return GENERIC_PROFILE
+    scores = {}
+    for group in seen:
+        key = group.split("__", 1)[0]
+        scores[key] = scores.get(key, 0) + 1
+    # ties go to the profile registered first
+    best = max(ISSUER_PROFILES, key=lambda k: scores.get(k, 0))
+    return ISSUER_PROFILES[best]
+
 # -------------------- Helpers --------------------
 def _clean_token_str(s: str) -> str:
     if s is None:
         return ""
     s = str(s).strip()
-    s = re.sub(r"\b(AAN|ANN|A/\w+)\b", "", s, flags=re.IGNORECASE)
+    s = _RE_NOISE_CODES.sub("", s)
     s = s.replace("\u200b", "").replace("\xa0", " ")
-    s = re.sub(r"\s+", " ", s).strip()
+    s = _RE_WHITESPACE.sub(" ", s).strip()
     s = s.strip(" ,;:")
     return s
 
+_CENT = Decimal("0.01")
+# wide enough for any float, so quantize() never runs out of digits
+_MONEY_CONTEXT = Context(prec=400)
+
+class Money:
+    """
+    An amount in minor units (paise/cents) plus its currency code. Amounts
+    stay typed through parse_fields and are only turned into display
+    strings ("₹1,234.00") when a response is serialized. `decimals` records
+    whether the source amount had a fractional part, which decides between
+    "₹1,234" and "₹1,234.00". `negative` is kept separately so that "-0.00"
+    survives as written. Instances are shared by the _normalize_money
+    cache and must not be mutated.
+    """
+    __slots__ = ("minor", "currency", "decimals", "negative")
+    SYMBOLS = {"INR": "₹", "USD": "$"}
+
+    def __init__(self, minor, currency="INR", decimals=True, negative=None):
+        self.minor = minor
+        self.currency = currency
+        self.decimals = decimals
+        self.negative = minor < 0 if negative is None else negative
+
+    @classmethod
+    def parse(cls, num, currency="INR"):
+        """Build from a plain numeric string such as "-1234.5" or "500"."""
+        if "." not in num:
+            return cls(int(num) * 100, currency, False)
+        whole, _, frac = num.partition(".")
+        if len(frac) <= 2 and len(whole) + len(frac) <= 15:
+            # exact, and the same digits float formatting would show
+            negative = whole.startswith("-")
+            minor = abs(int(whole or "0")) * 100 + int(frac.ljust(2, "0"))
+            return cls(-minor if negative else minor, currency, True, negative)
+        # round the float value half-even, as f"{float(num):.2f}" does
+        cents = Decimal(float(num)).quantize(_CENT, rounding=ROUND_HALF_EVEN, context=_MONEY_CONTEXT)
+        return cls(int(cents * 100), currency, True, cents.is_signed())
+
+    @property
+    def amount(self):
+        return self.minor / 100
+
+    def to_json(self):
+        return {"amount": self.amount, "minor_units": self.minor, "currency": self.currency}
+
+    def __str__(self):
+        whole, frac = divmod(abs(self.minor), 100)
+        body = f"{whole:,}.{frac:02d}" if self.decimals else f"{whole:,}"
+        return f"{self.SYMBOLS[self.currency]}{'-' if self.negative else ''}{body}"
+
+    def __repr__(self):
+        return f"Money({self.minor}, {self.currency!r}, decimals={self.decimals}, negative={self.negative})"
+
+    def _key(self):
+        return self.minor, self.currency, self.decimals, self.negative
+
+    def __eq__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+@lru_cache(maxsize=4096)
 def _normalize_money(raw):
+    """Return a Money for the first amount in `raw`, the cleaned text when it has none, or None."""
     if raw is None:
         return None
     s = _clean_token_str(str(raw))
     # treat parentheses as positive
-    paren = re.search(r"\(([\d,\.]+)\)", s)
+    paren = _RE_PAREN_NUMBER.search(s)
     if paren:
         s = paren.group(1)
     # currency detection
-    rupee_present = bool(re.search(r"(₹|Rs\.?|INR)", s))
-    usd_present = bool(re.search(r"(\$|USD|US\$)", s))
+    rupee_present = bool(_RE_RUPEE.search(s))
+    usd_present = bool(_RE_USD.search(s))
     # find numeric portion
-    m = re.search(r"(-?\d{1,3}(?:[,0-9]*)(?:\.\d+)?|-?\d+\.\d+)", s.replace(" ", ""))
+    m = _RE_NUMERIC_PART.search(s.replace(" ", ""))
     if not m:
         return s if s else None
     num = m.group(1).replace(",", "")
     try:
-        if "." in num:
-            v = float(num)
-            if rupee_present:
-                return f"₹{v:,.2f}"
-            if usd_present:
-                return f"${v:,.2f}"
-            return f"₹{v:,.2f}"
-        else:
-            v = int(num)
-            if rupee_present:
-                return f"₹{v:,}"
-            if usd_present:
-                return f"${v:,}"
-            return f"₹{v:,}"
+        return Money.parse(num, "USD" if usd_present and not rupee_present else "INR")
     except Exception:
         return s
 
+def _clean_numeric_token(tok):
+    if tok is None:
+        return None
+    if isinstance(tok, Money):
+        return tok
+    s = str(tok)
+    s = _RE_NON_NUMERIC.sub("", s)
+    m_paren = _RE_PAREN_NUMBER.search(s)
+    if m_paren:
+        return _normalize_money(m_paren.group(1))
+    s = s.strip(" ,")
+    s = _RE_LEADING_MINUS.sub("", s)
+    try:
+        normalized = _normalize_money(s)
+        return normalized
+    except:
+        return s
+
 def _find_all_numbers_with_pos(text):
     tokens = []
     if not text:
         return tokens
-    pattern = re.compile(r"(?:₹|Rs\.?|INR|\$)?\s*-?\d{1,3}(?:[,\d]{0,})?(?:\.\d+)?", re.IGNORECASE)
-    for m in pattern.finditer(text):
+    starts = set()
+    for m in _RE_MONEY_I.finditer(text):
+        tokens.append((m.start(), m.end(), m.group(0)))
+        starts.add(m.start())
+    for m in _RE_LONG_NUMBER.finditer(text):
         raw = m.group(0)
-        norm = _normalize_money(raw)
-        tokens.append((m.start(), m.end(), raw, norm))
-    pattern2 = re.compile(r"\b\d{4,}\b")
-    for m in pattern2.finditer(text):
-        raw = m.group(0)
-        if not any(abs(m.start()-t[0]) < 2 for t in tokens):
-            norm = _normalize_money(raw)
-            tokens.append((m.start(), m.end(), raw, norm))
+        s = m.start()
+        if s not in starts and s - 1 not in starts and s + 1 not in starts:
+            tokens.append((s, m.end(), raw))
+            starts.add(s)
     tokens.sort(key=lambda x: x[0])
     return tokens
 
 def _find_date_in_line(text):
     if not text:
         return None
-    m = re.search(r"(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})", text)
+    m = _RE_NUMERIC_DATE.search(text)
     if m:
-        return m.group(1)
-    m = re.search(r"([A-Za-z]{3,9}\s+\d{1,2},\s*\d{4})", text)
+        return m.group(0)
+    m = _RE_WORD_DATE.search(text)
     if m:
-        return m.group(1)
+        return m.group(0)
     return None
 
-def _closest_number_to_label(text, label_regexes, tokens):
-    label_pos = None
-    for rg in label_regexes:
-        m = re.search(rg, text, re.IGNORECASE)
-        if m:
-            label_pos = m.start()
-            break
+class NumberIndex:
+    """
+    Per-document index over the number tokens of `text`, built once and
+    shared by every label lookup: newline offsets, token starts and token
+    midpoints in sorted arrays, and the first match of each label regex.
+    Lookups bisect these instead of scanning and sorting the token list.
+    """
+    __slots__ = ("text", "tokens", "starts", "newlines", "mids", "by_mid", "labels", "_fallbacks")
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = _find_all_numbers_with_pos(text)
+        self.starts = [tok[0] for tok in self.tokens]
+        self.newlines = [m.start() for m in _RE_NEWLINE.finditer(text)]
+        mids = [(tok[0] + tok[1]) // 2 for tok in self.tokens]
+        self.by_mid = sorted(range(len(mids)), key=mids.__getitem__)
+        self.mids = [mids[i] for i in self.by_mid]
+        self.labels = {}
+        # positions of earlier document-wide fallbacks; ties between equally
+        # close tokens go the way they did when each fallback re-sorted the
+        # shared token list by distance
+        self._fallbacks = []
+
+    def label_pos(self, label_regexes):
+        """Offset of the first match of the first matching regex, or None."""
+        for rg in label_regexes:
+            if rg not in self.labels:
+                m = rg.search(self.text)
+                self.labels[rg] = m.start() if m else None
+            if self.labels[rg] is not None:
+                return self.labels[rg]
+        return None
+
+    def _pick(self, candidates, pos):
+        if len(candidates) == 1:
+            return candidates[0]
+        mid = lambda i: (self.tokens[i][0] + self.tokens[i][1]) // 2
+        return min(candidates, key=lambda i: (abs(mid(i) - pos), *(abs(mid(i) - p) for p in reversed(self._fallbacks)), i))
+
+    def same_line(self, pos):
+        """Index of the token nearest `pos` on pos's line, or None."""
+        i = bisect_left(self.newlines, pos)
+        line_start = self.newlines[i - 1] if i else -1
+        line_end = self.newlines[i] if i < len(self.newlines) else len(self.text)
+        lo = bisect_left(self.starts, line_start)
+        hi = bisect_left(self.starts, line_end, lo)
+        on_line = [j for j in range(lo, hi) if self.tokens[j][1] <= line_end]
+        if not on_line:
+            return None
+        dist = {j: abs((self.tokens[j][0] + self.tokens[j][1]) // 2 - pos) for j in on_line}
+        best = min(dist.values())
+        return self._pick([j for j in on_line if dist[j] == best], pos)
+
+    def nearest(self, pos):
+        """Index of the token nearest `pos` anywhere in the document, or None."""
+        if not self.tokens:
+            return None
+        k = bisect_left(self.mids, pos)
+        best = min(abs(self.mids[j] - pos) for j in (k - 1, k) if 0 <= j < len(self.mids))
+        candidates = []
+        for m in {pos - best, pos + best}:
+            candidates.extend(self.by_mid[bisect_left(self.mids, m):bisect_right(self.mids, m)])
+        choice = self._pick(candidates, pos)
+        self._fallbacks.append(pos)
+        return choice
+
+def _closest_number_to_label(index, label_regexes):
+    """Normalized amount of the token nearest the first matching label (same line first)."""
+    label_pos = index.label_pos(label_regexes)
     if label_pos is None:
         return None
-    newline_before = text.rfind("\n", 0, label_pos)
-    newline_after = text.find("\n", label_pos)
-    if newline_after == -1:
-        newline_after = len(text)
-    same_line_tokens = [t for t in tokens if t[0] >= newline_before and t[1] <= newline_after]
-    if same_line_tokens:
-        same_line_tokens.sort(key=lambda t: abs((t[0]+t[1])//2 - label_pos))
-        return same_line_tokens[0][3]
-    if tokens:
-        tokens.sort(key=lambda t: abs((t[0]+t[1])//2 - label_pos))
-        return tokens[0][3]
-    return None
+    j = index.same_line(label_pos)
+    if j is None:
+        j = index.nearest(label_pos)
+    return None if j is None else _normalize_money(index.tokens[j][2])
+
+def _scan_lines(lines, rules=_LINE_RULES):
+    """
+    Walk the document lines once and return {rule name: [line indices]}
+    for every rule in `rules` (a list shaped like _LINE_RULES).
+    """
+    hits = {name: [] for name, _, _ in rules}
+    pending = list(rules)
+    for i, ln in enumerate(lines):
+        settled = False
+        for name, rg, first_only in pending:
+            if rg.search(ln):
+                hits[name].append(i)
+                settled = settled or first_only
+        if settled:
+            pending = [r for r in pending if not (r[2] and hits[r[0]])]
+    return hits
 
 # ---------------- debug line map helper ----------------
 def _build_line_map(text):
     """
-    Return a list of dicts: {index, line, numbers_found}
-    and also write a debug file debug_line_map.txt for quick inspection.
+    Return a list of dicts: {index, line, numbers}
+    for every non-empty line that contains a number.
     """
     lines = [ln.rstrip() for ln in text.splitlines()]
     line_map = []
-    pattern = re.compile(r"(?:₹|Rs\.?|INR|\$)?\s*-?\d{1,3}(?:[,\d]{0,})?(?:\.\d+)?", re.IGNORECASE)
-    debug_lines = []
     for i, ln in enumerate(lines):
         if not ln.strip():
             continue
-        nums = pattern.findall(ln)
+        nums = _RE_MONEY_I.findall(ln)
         if nums:
             entry = {"index": i, "line": ln, "numbers": nums}
             line_map.append(entry)
-            debug_lines.append(f"{i:03d}: {ln}")
-            debug_lines.append(f"      → {nums}")
-    # write to file so you can open it even if console doesn't show prints
-    try:
-        debug_path = os.path.join(os.getcwd(), "debug_line_map.txt")
-        with open(debug_path, "w", encoding="utf-8") as f:
-            f.write("\n".join(debug_lines))
-    except Exception as e:
-        print(f"[DEBUG] Could not write debug_line_map.txt: {e}")
     return line_map
 
+def _format_line_map(line_map):
+    debug_lines = []
+    for entry in line_map:
+        debug_lines.append(f"{entry['index']:03d}: {entry['line']}")
+        debug_lines.append(f"      → {entry['numbers']}")
+    return "\n".join(debug_lines)
+
+def _sanitize_text_field(k, v):
+    """Final clean-up of a non-Money field value; returns None for junk."""
+    if v is None or str(v).strip() == "":
+        return None
+    s = str(v).strip()
+    # Accept zero for certain fields
+    if s in [",", ".", "-", "0", "0.00"]:
+        if k == "Minimum Payment Due":
+            return Money(0, "INR", decimals=False)
+        if k in ["Purchases", "Interest Charged"]:
+            return s if _RE_HAS_DIGIT.search(s) else Money(0, "INR", decimals=True)
+        return None
+    numstr = _RE_STRIP_TO_NUMBER.sub("", s)
+    try:
+        if numstr != "":
+            valf = float(numstr)
+            if valf < 0 or valf > 10_000_000:
+                return None
+    except:
+        pass
+    if _RE_SINGLE_LETTER.fullmatch(s):
+        return None
+    return s
+
 # ---------------- parse_improved (final) ----------------
-def parse_improved(text):
+def parse_improved(text, profile=None):
+    """parse_fields() with every value formatted for display ("N/A" when missing)."""
+    return format_fields(parse_fields(text, profile))
+
+def format_fields(fields):
+    return {k: "N/A" if v is None else str(v) for k, v in fields.items()}
+
+def field_values(fields):
+    """The raw numeric values of the amount fields, for JSON responses."""
+    return {k: v.to_json() for k, v in fields.items() if isinstance(v, Money)}
+
+def parse_fields(text, profile=None, preset=None, sanitize=True):
     """
     Enhanced parser tuned for HDFC-style extracted text:
     - handles parentheses/negative formatting,
     - finds Payment Due Date in following lines,
     - maps Account Summary row (column mapping tuned),
     - line-aware extraction and safe fallbacks.
+
+    Line rules are collected in one pass (_scan_lines) and the number
+    tokens are located once; the full-text rules only run as fallbacks.
+    `profile` selects the issuer rule set (default: GENERIC_PROFILE).
+
+    Amounts are returned as Money, other fields as strings, and fields
+    that were not found as None. `preset` holds fields already resolved
+    elsewhere (the layout-aware mode); their rules are skipped. With
+    sanitize=False the final clamp (sanitize_fields) is left to the caller.
     """
+    profile = profile or GENERIC_PROFILE
     fields = {
         "Total Balance Due": None,
         "Payment Due Date": None,
@@ -162,229 +792,1896 @@ def parse_improved(text):
         "Available Credit": None,
         "Annual Percentage Rate": None
     }
+    if preset:
+        fields.update(preset)
 
     if not text:
-        return {k: "N/A" for k in fields}
+        return fields
 
     t = text.replace('\u200b', ' ').replace('\xa0', ' ')
     lines = [ln.strip() for ln in t.splitlines() if ln.strip() != ""]
+    clock = _RuleClock()
+    hits = _scan_lines(lines, profile.line_rules)
+    clock.lap("scan_lines")
 
-    def _clean_numeric_token(tok):
-        if tok is None:
-            return None
-        s = str(tok)
-        s = re.sub(r"[^\d\.\,\-\(\)₹Rs\$]", "", s)
-        m_paren = re.search(r"\(([\d,\.]+)\)", s)
-        if m_paren:
-            return _normalize_money(m_paren.group(1))
-        s = s.strip(" ,")
-        s = re.sub(r"^-+", "", s)
-        try:
-            normalized = _normalize_money(s)
-            return normalized
-        except:
-            return s
-
-    all_tokens = _find_all_numbers_with_pos(t)
-    dedup_tokens = []
-    seen = set()
-    for _, _, raw, norm in all_tokens:
-        if norm and norm not in seen:
-            cleaned = _clean_numeric_token(norm)
-            if cleaned and cleaned not in seen:
-                dedup_tokens.append(cleaned)
-                seen.add(cleaned)
-
-    used = set()
+    used = {v for v in fields.values() if isinstance(v, Money)}
 
     # Card last 4 digits (prefer lines with 'card' etc)
     card_last4 = None
-    for i, ln in enumerate(lines):
-        if re.search(r"\b(card|card no|card number|account number|ending in|ending)\b", ln, re.IGNORECASE):
-            m4 = re.findall(r"(\d{4})\b", ln)
-            if m4:
-                card_last4 = m4[-1]
-                break
+    for i in hits["card"]:
+        m4 = _RE_LAST4.findall(lines[i])
+        if m4:
+            card_last4 = m4[-1]
+            break
     if not card_last4:
-        all4 = re.findall(r"\b(\d{4})\b", t)
+        all4 = _RE_ANY4.findall(t)
         if all4:
             filtered = [g for g in all4 if not (1900 <= int(g) <= 2099)]
             card_last4 = filtered[-1] if filtered else all4[-1]
     if card_last4:
         fields["Card Last 4 Digits"] = card_last4
+    clock.lap("card_last4")
 
     # Billing cycle / statement date
-    for i, ln in enumerate(lines):
-        if re.search(r"(Statement Date|Statement Period|Billing Cycle)", ln, re.IGNORECASE):
-            d = re.findall(r"\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}", ln)
-            if d:
-                fields["Billing Cycle Dates"] = f"{d[0]}" if len(d)==1 else f"{d[0]} - {d[1]}"
-            else:
-                if i+1 < len(lines):
-                    d2 = re.findall(r"\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}", lines[i+1])
-                    if d2:
-                        fields["Billing Cycle Dates"] = d2[0]
-            break
+    if hits["billing"] and fields["Billing Cycle Dates"] is None:
+        i = hits["billing"][0]
+        d = _RE_NUMERIC_DATE.findall(lines[i])
+        if d:
+            fields["Billing Cycle Dates"] = f"{d[0]}" if len(d)==1 else f"{d[0]} - {d[1]}"
+        else:
+            if i+1 < len(lines):
+                d2 = _RE_NUMERIC_DATE.findall(lines[i+1])
+                if d2:
+                    fields["Billing Cycle Dates"] = d2[0]
+    clock.lap("billing_cycle")
 
     # Payment Due Date (search header then next lines)
-    for i, ln in enumerate(lines):
-        if re.search(r"Payment\s*Due\s*Date", ln, re.IGNORECASE):
-            dt = _find_date_in_line(ln)
-            if dt:
-                fields["Payment Due Date"] = dt
-            else:
-                for j in range(i+1, min(i+4, len(lines))):
-                    dt2 = _find_date_in_line(lines[j])
-                    if dt2:
-                        fields["Payment Due Date"] = dt2
-                        break
-            break
+    if hits["due_date"] and fields["Payment Due Date"] is None:
+        i = hits["due_date"][0]
+        dt = _find_date_in_line(lines[i])
+        if dt:
+            fields["Payment Due Date"] = dt
+        else:
+            for j in range(i+1, min(i+4, len(lines))):
+                dt2 = _find_date_in_line(lines[j])
+                if dt2:
+                    fields["Payment Due Date"] = dt2
+                    break
     if fields["Payment Due Date"] is None:
-        for i, ln in enumerate(lines):
-            if re.search(r"(Total\s+Dues|Minimum\s+Payment|Minimum\s+Amount)", ln, re.IGNORECASE):
-                for j in range(i, min(i+4, len(lines))):
-                    dt3 = _find_date_in_line(lines[j])
-                    if dt3:
-                        fields["Payment Due Date"] = dt3
-                        break
+        for i in hits["due_hint"]:
+            for j in range(i, min(i+4, len(lines))):
+                dt3 = _find_date_in_line(lines[j])
+                if dt3:
+                    fields["Payment Due Date"] = dt3
+                    break
             if fields["Payment Due Date"]:
                 break
+    clock.lap("payment_due_date")
 
     # Account Summary row detection
-    for i, ln in enumerate(lines):
-        if re.search(r"Account\s+Summary", ln, re.IGNORECASE) or re.search(r"Opening\s+Payment\/\s*Purchase\/\s*Finance", ln, re.IGNORECASE) or re.search(r"Opening\s+Balance.*Payments.*Purchase", ln, re.IGNORECASE):
-            numeric_row = None
-            for j in range(i+1, min(i+6, len(lines))):
-                nums = re.findall(r"(?:₹|Rs\.?|INR|\$)?\s*-?\d{1,3}(?:[,\d]{0,})?(?:\.\d+)?", lines[j])
-                if len(nums) >= 3:
-                    numeric_row = nums
-                    row_line_idx = j
-                    break
-            if numeric_row:
-                cleaned_nums = [_clean_numeric_token(n) for n in numeric_row]
-                while len(cleaned_nums) < 5:
-                    cleaned_nums.append(None)
-                # Based on your sample this mapping works better:
-                # Opening Balance | Finance Charges | Purchases | Payments/Credits | Total Dues
-                mapping = [
-                    ("Previous Balance", cleaned_nums[0]),
-                    ("Interest Charged", cleaned_nums[1]),
-                    ("Purchases", cleaned_nums[2]),
-                    ("Payments, Credits", cleaned_nums[3]),
-                    ("Total Balance Due", cleaned_nums[4])
-                ]
-                for key, val in mapping:
-                    if val and val != "N/A" and val not in used:
-                        fields[key] = val
-                        used.add(val)
-                # Detect Available Credit nearby
-                if fields["Available Credit"] in [None, "N/A"]:
-                    m = re.search(r"Available\s+(?:Credit|Credit\s+Limit)[:\s]*₹?\s*([\d,\.]+)", t, re.IGNORECASE)
-                    if m:
-                        fields["Available Credit"] = _clean_numeric_token(m.group(1))
+    summary_columns = [k for k in profile.summary_columns or () if fields[k] is None]
+    for i in (hits["summary"] if summary_columns else ()):
+        numeric_row = None
+        for j in range(i+1, min(i+6, len(lines))):
+            nums = _RE_MONEY.findall(lines[j])
+            if len(nums) >= 3:
+                numeric_row = nums
                 break
+        if numeric_row:
+            cleaned_nums = [_clean_numeric_token(n) for n in numeric_row]
+            # column order comes from the profile; for HDFC it is
+            # Opening Balance | Finance Charges | Purchases | Payments/Credits | Total Dues
+            for key, val in zip(profile.summary_columns, cleaned_nums):
+                if key in summary_columns and val and val != "N/A" and val not in used:
+                    fields[key] = val
+                    used.add(val)
+            # Detect Available Credit nearby
+            if fields["Available Credit"] in [None, "N/A"]:
+                m = _RE_AVAILABLE_CREDIT.search(t)
+                if m:
+                    fields["Available Credit"] = _clean_numeric_token(m.group(1))
+            break
+    clock.lap("account_summary")
 
     # If Total Balance Due still missing, search Total Dues lines
     if fields["Total Balance Due"] is None:
-        for i, ln in enumerate(lines):
-            if re.search(r"(Total\s+Dues|Total\s+Amount\s+Due|Amount\s+Payable|Outstanding\s+Balance)", ln, re.IGNORECASE):
-                nums = re.findall(r"(?:₹|Rs\.?|INR|\$)?\s*-?\d{1,3}(?:[,\d]{0,})?(?:\.\d+)?", ln)
-                if nums:
-                    val = _clean_numeric_token(nums[-1])
-                    if val and val not in used:
-                        fields["Total Balance Due"] = val
-                        used.add(val)
+        for i in hits["total_dues"]:
+            nums = _RE_MONEY.findall(lines[i])
+            if nums:
+                val = _clean_numeric_token(nums[-1])
+                if val and val not in used:
+                    fields["Total Balance Due"] = val
+                    used.add(val)
+                    break
+            if i+1 < len(lines):
+                nums2 = _RE_MONEY.findall(lines[i+1])
+                if nums2:
+                    val2 = _clean_numeric_token(nums2[-1])
+                    if val2 and val2 not in used:
+                        fields["Total Balance Due"] = val2
+                        used.add(val2)
                         break
-                if i+1 < len(lines):
-                    nums2 = re.findall(r"(?:₹|Rs\.?|INR|\$)?\s*-?\d{1,3}(?:[,\d]{0,})?(?:\.\d+)?", lines[i+1])
-                    if nums2:
-                        val2 = _clean_numeric_token(nums2[-1])
-                        if val2 and val2 not in used:
-                            fields["Total Balance Due"] = val2
-                            used.add(val2)
-                            break
     # fallback for Total Balance Due general pattern
     if fields["Total Balance Due"] in [None, "N/A"]:
-        m = re.search(r"(?:Total\s+Dues|Total\s+Amount\s+Due|Outstanding\s+Amount|Amount\s+Payable)[:\s]*₹?\s*([\d,\,\.]+)", t, re.IGNORECASE)
+        m = _RE_TOTAL_DUE_TEXT.search(t)
         if m:
             fields["Total Balance Due"] = _clean_numeric_token(m.group(1))
+    clock.lap("total_balance_due")
 
     # Fallback for Payments,Credit explicit matches
     if fields["Payments, Credits"] in [None, "N/A"]:
-        m = re.search(r"Payments[,\s]+Credits[:\s]*₹?\s*([\d,\,\.]+)", t, re.IGNORECASE)
+        m = _RE_PAYMENTS_CREDITS.search(t)
         if not m:
-            m = re.search(r"Payments\s*[:\s]*₹?\s*([\d,\,\.]+)", t, re.IGNORECASE)
+            m = _RE_PAYMENTS.search(t)
         if m:
             fields["Payments, Credits"] = _clean_numeric_token(m.group(1))
+    clock.lap("payments_credits")
 
     # Try to fill some other fields by label proximity
-    label_map = {
-        "Credit Access Line": [r"Credit\s+Limit", r"Credit\s+Access\s+Line", r"Credit\s+Line"],
-        "Available Credit": [r"Available\s+Credit", r"Available\s+Limit", r"Available\s+Credit\s+Limit"],
-        "Minimum Payment Due": [r"Minimum\s+(?:Payment|Amount)\s+Due", r"\bMin\s+Payment\b"],
-        "Interest Charged": [r"Interest\s+Charged", r"Finance\s+Charges?", r"\bInterest\b"],
-        "Purchases": [r"\bPurchases\b", r"Purchase\s*\/\s*Debits"],
-        "Previous Balance": [r"Previous\s+Balance", r"Opening\s+Balance"],
-    }
-
-    tokens_pos = _find_all_numbers_with_pos(t)
-    for field_name, regexes in label_map.items():
+    number_index = None
+    for field_name, regexes in profile.label_rules:
         if fields.get(field_name) is not None and fields[field_name] != "N/A":
             continue
-        val = _closest_number_to_label(t, regexes, tokens_pos)
+        if number_index is None:
+            number_index = NumberIndex(t)
+        val = _closest_number_to_label(number_index, regexes)
         if val:
             cleaned = _clean_numeric_token(val)
             if cleaned and cleaned not in used:
                 fields[field_name] = cleaned
                 used.add(cleaned)
+        clock.lap(f"label:{field_name}")
 
     # Minimum Payment Due specific attempt
     if fields["Minimum Payment Due"] in [None, "N/A"]:
-        m_min = re.search(r"Minimum\s+(?:Amount|Payment)\s+Due[:\s]*₹?\s*([\d,\,\.]+)", t, re.IGNORECASE)
+        m_min = _RE_MINIMUM_DUE.search(t)
         if not m_min:
             header_idx = t.find("Minimum Amount Due")
             if header_idx != -1:
                 snippet = t[header_idx:header_idx+120]
-                m2 = re.search(r"₹?\s*([\d,\,\.]+)", snippet)
+                m2 = _RE_SNIPPET_AMOUNT.search(snippet)
                 if m2:
                     m_min = m2
         if m_min:
             fields["Minimum Payment Due"] = _clean_numeric_token(m_min.group(1))
+    clock.lap("minimum_payment_due")
+
+    if profile.apr_rule is not None and fields["Annual Percentage Rate"] is None:
+        m_apr = profile.apr_rule.search(t)
+        if m_apr:
+            fields["Annual Percentage Rate"] = f"{m_apr.group(1)}%"
+        clock.lap("apr")
+
+    if sanitize:
+        sanitize_fields(fields)
+        clock.lap("sanitize")
 
-    # Final sanitization and clamp unrealistic numbers
-    for k in list(fields.keys()):
-        v = fields[k]
-        if v is None or str(v).strip() == "":
-            fields[k] = "N/A"
+    return fields
+
+def sanitize_fields(fields):
+    """Final sanitization and clamp of unrealistic numbers; updates `fields` in place and returns it."""
+    for k, v in fields.items():
+        if isinstance(v, Money):
+            if v.minor == 0 and v.currency == "INR" and not v.negative:
+                # zero is only meaningful for these fields
+                if k == "Minimum Payment Due":
+                    fields[k] = Money(0, "INR", decimals=False)
+                elif k not in ("Purchases", "Interest Charged"):
+                    fields[k] = None
+            elif abs(v.minor) > 10_000_000 * 100:
+                fields[k] = None
             continue
-        s = str(v).strip()
-        # Accept zero for certain fields
-        if s in [",", ".", "-", "₹0", "₹0.00", "0", "0.00"]:
-            if k == "Minimum Payment Due":
-                fields[k] = "₹0"
+        fields[k] = _sanitize_text_field(k, v)
+    return fields
+
+# -------------------- PDF text extraction --------------------
+# Pages are fanned out to a process pool for larger documents; small ones are
+# extracted on the request thread where the pool overhead would dominate.
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+
+_extract_pool = None
+_extract_pool_lock = threading.Lock()
+
+def _clean_page_text(ptext):
+    return (ptext or "").replace('\u200b', ' ').replace('\xa0', ' ')
+
+def _extract_pages(pdf, indices, page_seconds):
+    out = []
+    for i in indices:
+        page = pdf.pages[i]
+        started = time.perf_counter()
+        try:
+            out.append(_clean_page_text(page.extract_text()))
+        except Exception:
+            # keep the slot so page order is preserved; joined text skips it
+            out.append(None)
+        finally:
+            # drop the page's parsed layout so memory doesn't grow with page count
+            page.close()
+        page_seconds.append(time.perf_counter() - started)
+    return out
+
+def _extract_page_list(source, indices):
+    """
+    Process-pool worker: extract the given pages from the raw PDF.
+    Returns (page texts, per-page seconds) so the parent can record timings.
+    """
+    page_seconds = []
+    with open_pdf(source) as pdf:
+        return _extract_pages(pdf, indices, page_seconds), page_seconds
+
+def _observe_pages(page_seconds, mode):
+    for secs in page_seconds:
+        PAGE_SECONDS.observe(secs, mode=mode)
+
+def _process_pool(workers):
+    """
+    ProcessPoolExecutor whose workers are started by a forkserver (spawn
+    where that isn't available) rather than forked from the caller. Pools
+    are created from request threads, and a fork taken while another
+    thread holds a cache or metrics lock would leave the child deadlocked.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+
+def _get_extract_pool():
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is None:
+            _extract_pool = _process_pool(PDF_EXTRACT_WORKERS)
+        return _extract_pool
+
+def _reset_extract_pool():
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is not None:
+            _extract_pool.shutdown(wait=False, cancel_futures=True)
+        _extract_pool = None
+
+def extract_pdf_pages(source, parallel=True, start=0, ocr=None):
+    """
+    Return the cleaned text of every page from `start` on, in page order.
+    `source` is the PDF as bytes or as a file path (see open_pdf); pool
+    workers get the path rather than a copy of the bytes.
+    Pages whose content is already in page_cache are not re-extracted.
+    Pages that fail to extract are returned as None.
+    With an OcrRun, pages that come back blank are OCR'd (ocr_blank_pages).
+    Pass parallel=False from code that already runs inside a worker process.
+    """
+    pages = _extract_text_pages(source, parallel, start)
+    if ocr is not None:
+        ocr_blank_pages(source, pages, ocr, parallel, start)
+    return pages
+
+def _extract_text_pages(source, parallel, start):
+    with open_pdf(source) as pdf:
+        keys = _page_cache_keys(pdf.pages[start:])
+        pages = [page_cache.get(k) if k else None for k in keys]
+        missing = [start + i for i, text in enumerate(pages) if text is None]
+        if not missing:
+            return pages
+        if not parallel or PDF_EXTRACT_WORKERS <= 1 or len(missing) < PDF_PARALLEL_MIN_PAGES:
+            page_seconds = []
+            texts = _extract_pages(pdf, missing, page_seconds)
+            _observe_pages(page_seconds, "sequential")
+            return _fill_pages(pages, keys, start, missing, texts)
+
+    from concurrent.futures.process import BrokenProcessPool
+    chunk = -(-len(missing) // PDF_EXTRACT_WORKERS)
+    try:
+        pool = _get_extract_pool()
+        futures = [pool.submit(_extract_page_list, source, missing[i:i + chunk])
+                   for i in range(0, len(missing), chunk)]
+        texts = []
+        for fut in futures:
+            chunk_texts, page_seconds = fut.result()
+            texts.extend(chunk_texts)
+            _observe_pages(page_seconds, "pool")
+    except BrokenProcessPool:
+        print("[EXTRACT] process pool broke, falling back to sequential extraction")
+        _reset_extract_pool()
+        texts, page_seconds = _extract_page_list(source, missing)
+        _observe_pages(page_seconds, "sequential")
+    return _fill_pages(pages, keys, start, missing, texts)
+
+def _fill_pages(pages, keys, start, missing, texts):
+    for i, text in zip(missing, texts):
+        pages[i - start] = text
+        if text is not None and keys[i - start]:
+            page_cache.put(keys[i - start], text)
+    return pages
+
+def extract_pdf_text(source, parallel=True):
+    return _join_pages(extract_pdf_pages(source, parallel))
+
+def _join_pages(pages):
+    return "".join(p + "\n" for p in pages if p is not None)
+
+def iter_pdf_pages(source, stop=None, ocr=None, parallel=True):
+    """
+    Lazily yield the cleaned text of pages [0, stop) one at a time
+    (None for pages that fail). Each page's layout cache is released as
+    soon as its text is taken. With an OcrRun, blank pages are OCR'd.
+    """
+    with open_pdf(source) as pdf:
+        for i, page in enumerate(pdf.pages[:stop]):
+            key = _page_cache_keys([page])[0]
+            ptext = page_cache.get(key) if key else None
+            if ptext is None:
+                started = time.perf_counter()
+                try:
+                    ptext = _clean_page_text(page.extract_text())
+                except Exception:
+                    ptext = None
+                finally:
+                    page.close()
+                PAGE_SECONDS.observe(time.perf_counter() - started, mode="incremental")
+                if ptext is not None and key:
+                    page_cache.put(key, ptext)
+            if ocr is not None and not (ptext or "").strip():
+                ptext = ocr_pages(source, [i], ocr, parallel).get(i, ptext)
+            yield ptext
+
+# -------------------- Result cache --------------------
+# Bump PARSER_VERSION whenever parse_improved's output can change so cached
+# results from an older parser are never served.
+PARSER_VERSION = "3"
+
+class ResultCache:
+    """
+    Content-addressed cache for /api/parse responses.
+    Keys are "<parser version>:<sha256 of the uploaded bytes>". Values are the
+    JSON-serialisable parse_statement() payload. A bounded in-memory LRU
+    sits in front of an optional SQLite tier that survives restarts.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024, ttl=24 * 3600,
+                 db_path=None, db_max_entries=10_000):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.db_path = db_path
+        self.db_max_entries = db_max_entries
+        self._mem = OrderedDict()  # key -> (expires_at, size, value)
+        self._mem_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if db_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS parse_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                    "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+
+    @staticmethod
+    def make_key(pdf_bytes, *parts, digest=None):
+        h = digest or hashlib.sha256(pdf_bytes).hexdigest()
+        return ":".join([PARSER_VERSION, *[str(p) for p in parts], h])
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                expires_at, size, value = entry
+                if expires_at > now:
+                    self._mem.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._mem[key]
+                self._mem_bytes -= size
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        "SELECT value, expires_at FROM parse_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row and row[1] > now:
+                        conn.execute("UPDATE parse_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                        value = json.loads(row[0])
+                        self._put_mem(key, value, len(row[0]), row[1])
+                        with self._lock:
+                            self.disk_hits += 1
+                        return value
+                    if row:
+                        conn.execute("DELETE FROM parse_cache WHERE key = ?", (key,))
+            except sqlite3.Error as e:
+                print(f"[CACHE] disk lookup failed: {e}")
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        encoded = json.dumps(value)
+        expires_at = time.time() + self.ttl
+        self._put_mem(key, value, len(encoded), expires_at)
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO parse_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                        (key, encoded, expires_at, time.time()),
+                    )
+                    conn.execute("DELETE FROM parse_cache WHERE expires_at <= ?", (time.time(),))
+                    conn.execute(
+                        "DELETE FROM parse_cache WHERE key IN (SELECT key FROM parse_cache "
+                        "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                        (self.db_max_entries,),
+                    )
+            except sqlite3.Error as e:
+                print(f"[CACHE] disk write failed: {e}")
+
+    def _put_mem(self, key, value, size, expires_at):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._mem.pop(key, None)
+            if old is not None:
+                self._mem_bytes -= old[1]
+            self._mem[key] = (expires_at, size, value)
+            self._mem_bytes += size
+            while self._mem and (len(self._mem) > self.max_entries or self._mem_bytes > self.max_bytes):
+                _, (_, evicted_size, _) = self._mem.popitem(last=False)
+                self._mem_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            self._mem_bytes = 0
+        if self.db_path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM parse_cache")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "parser_version": PARSER_VERSION,
+                "entries": len(self._mem),
+                "bytes": self._mem_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else None,
+                "disk_enabled": bool(self.db_path),
+            }
+
+parse_cache = ResultCache(
+    max_entries=int(os.getenv("PARSE_CACHE_MAX_ENTRIES", "256")),
+    max_bytes=int(os.getenv("PARSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl=float(os.getenv("PARSE_CACHE_TTL", str(24 * 3600))),
+    db_path=os.getenv("PARSE_CACHE_DB") or None,
+    db_max_entries=int(os.getenv("PARSE_CACHE_DB_MAX_ENTRIES", "10000")),
+)
+
+# -------------------- Page text cache --------------------
+# Extracted text of single pages, keyed by a hash of what the page draws
+# rather than of the whole upload, so a page shared by many statements (terms
+# and conditions, rate tables) or re-read by another endpoint is extracted once.
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "2048"))
+_PAGE_HASH_MAX_DEPTH = 16
+
+page_cache = ResultCache(
+    max_entries=PAGE_CACHE_MAX_ENTRIES,
+    max_bytes=int(os.getenv("PAGE_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    ttl=float(os.getenv("PAGE_CACHE_TTL", str(24 * 3600))),
+)
+
+def _hash_pdf_object(h, obj, seen, depth=0, images=False):
+    """
+    Feed a PDF object tree into hash `h`. Streams contribute their decoded
+    data, except images, which cannot change the extracted text and are
+    hashed by their attributes only (plus their raw bytes with images=True).
+    """
+    from pdfminer.pdftypes import PDFObjRef, PDFStream, resolve1
+    from pdfminer.psparser import LIT
+    if isinstance(obj, PDFObjRef):
+        if obj.objid in seen or depth > _PAGE_HASH_MAX_DEPTH:
+            h.update(b"R%d;" % obj.objid)
+            return
+        seen.add(obj.objid)
+        obj = obj.resolve()
+    if isinstance(obj, PDFStream):
+        _hash_pdf_object(h, obj.attrs, seen, depth + 1, images)
+        if resolve1(obj.attrs.get("Subtype")) is not LIT("Image"):
+            h.update(obj.get_data())
+        elif images:
+            h.update(obj.get_rawdata() or b"")
+    elif isinstance(obj, dict):
+        h.update(b"{")
+        for key in sorted(obj, key=str):
+            h.update(str(key).encode("utf-8", "replace") + b":")
+            _hash_pdf_object(h, obj[key], seen, depth + 1, images)
+        h.update(b"}")
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"[")
+        for item in obj:
+            _hash_pdf_object(h, item, seen, depth + 1, images)
+        h.update(b"]")
+    elif isinstance(obj, bytes):
+        h.update(b"b%d:" % len(obj) + obj)
+    else:
+        h.update(repr(obj).encode("utf-8", "replace") + b";")
+
+def page_cache_key(page, images=False):
+    """
+    sha256 of everything that decides a page's extracted text: its content
+    streams, the resources they use (fonts, form XObjects), its boxes and
+    rotation, and the pdfplumber version. With images=True the image data
+    is included too, for keys of what a page looks like (OCR).
+    """
+    import pdfplumber
+    h = hashlib.sha256(pdfplumber.__version__.encode())
+    obj = page.page_obj
+    h.update(repr((obj.mediabox, obj.cropbox, obj.rotate)).encode())
+    seen = set()
+    for stream in obj.contents:
+        _hash_pdf_object(h, stream, seen, images=images)
+    h.update(b"|")
+    _hash_pdf_object(h, obj.resources, seen, images=images)
+    return h.hexdigest()
+
+def _page_cache_keys(pages):
+    """page_cache keys for `pages`, with None where the page can't be hashed or the cache is off."""
+    if PAGE_CACHE_MAX_ENTRIES <= 0:
+        return [None] * len(pages)
+    keys = []
+    for page in pages:
+        try:
+            keys.append(page_cache_key(page))
+        except Exception:
+            keys.append(None)
+    return keys
+
+# -------------------- OCR fallback --------------------
+# Scanned statements have pages with no text layer. With PARSE_OCR=1 only the
+# pages that come back blank from pdfplumber are rendered at OCR_DPI and read
+# by Tesseract (pytesseract and the tesseract binary must be installed), in a
+# process pool of OCR_WORKERS so concurrent uploads can't start more
+# tesseract processes than that. Each document gets OCR_DOC_BUDGET seconds
+# of OCR in total; pages still pending then stay blank. Results are cached by
+# page content hash, so a page is only OCR'd once.
+PARSE_OCR = os.getenv("PARSE_OCR", "0") == "1"
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(min(2, os.cpu_count() or 1))))
+OCR_DOC_BUDGET = float(os.getenv("OCR_DOC_BUDGET", "60"))
+
+ocr_cache = ResultCache(
+    max_entries=int(os.getenv("OCR_CACHE_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("OCR_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    ttl=float(os.getenv("OCR_CACHE_TTL", str(7 * 24 * 3600))),
+    db_path=os.getenv("OCR_CACHE_DB") or None,
+)
+ocr_stats = {"pages": 0, "cached": 0, "failed": 0, "skipped": 0}
+
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+_ocr_ready = None
+
+class OcrRun:
+    """OCR time budget and page counts for one document; the clock starts at its first OCR."""
+    __slots__ = ("budget", "deadline", "pages", "cached", "failed", "skipped")
+
+    def __init__(self, budget=None):
+        self.budget = OCR_DOC_BUDGET if budget is None else budget
+        self.deadline = None
+        self.pages = self.cached = self.failed = self.skipped = 0
+
+    def remaining(self):
+        if self.deadline is None:
+            self.deadline = time.monotonic() + self.budget
+        return self.deadline - time.monotonic()
+
+    def count(self, outcome, n=1):
+        setattr(self, outcome, getattr(self, outcome) + n)
+        ocr_stats[outcome] += n
+
+    def summary(self):
+        return {"pages": self.pages, "cached": self.cached, "failed": self.failed, "skipped": self.skipped}
+
+def _get_ocr_pool():
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            _ocr_pool = _process_pool(OCR_WORKERS)
+        return _ocr_pool
+
+def _reset_ocr_pool():
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is not None:
+            _ocr_pool.shutdown(wait=False, cancel_futures=True)
+        _ocr_pool = None
+
+def ocr_available():
+    """
+    Whether pytesseract and the tesseract binary can be used. Checked once
+    per process; when they can't, the reason is logged and OCR is skipped.
+    """
+    global _ocr_ready
+    if _ocr_ready is None:
+        try:
+            import pytesseract
+            pytesseract.get_tesseract_version()
+            _ocr_ready = True
+        except Exception as e:
+            print(f"[OCR] Tesseract is unavailable, OCR is disabled: {e}")
+            _ocr_ready = False
+    return _ocr_ready
+
+def _ocr_page(source, index, dpi, lang, timeout):
+    """
+    Pool worker: render page `index` at `dpi` and OCR it, giving tesseract
+    at most `timeout` seconds. Returns (cleaned text, seconds). Errors are
+    re-raised as RuntimeError: pytesseract's own exceptions can't be
+    unpickled in the parent and would break the pool.
+    """
+    started = time.perf_counter()
+    try:
+        import pypdfium2
+        import pytesseract
+        pdf = pypdfium2.PdfDocument(source)
+        try:
+            image = pdf[index].render(scale=dpi / 72).to_pil()
+        finally:
+            pdf.close()
+        text = pytesseract.image_to_string(image, lang=lang, timeout=max(1.0, timeout))
+    except Exception as e:
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+    return _clean_page_text(text), time.perf_counter() - started
+
+def ocr_cache_key(page):
+    return ResultCache.make_key(None, "ocr", OCR_DPI, OCR_LANG, digest=page_cache_key(page, images=True))
+
+def ocr_pages(source, indices, run, parallel=True):
+    """
+    OCR the given pages and return {index: text} for the ones that finished
+    within the run's budget. Cached pages are served from ocr_cache; the
+    rest go through the OCR pool, or run in-process with parallel=False
+    (from code that already runs inside a worker process).
+    """
+    keys = {}
+    with open_pdf(source) as pdf:
+        for i in indices:
+            try:
+                keys[i] = ocr_cache_key(pdf.pages[i])
+            except Exception:
+                keys[i] = None
+    out, todo = {}, []
+    for i in indices:
+        text = ocr_cache.get(keys[i]) if keys[i] else None
+        if text is None:
+            todo.append(i)
+        else:
+            out[i] = text
+    run.count("cached", len(out))
+    if not todo:
+        return out
+    if not ocr_available():
+        run.count("failed", len(todo))
+        return out
+
+    def finish(i, result):
+        text, secs = result
+        PAGE_SECONDS.observe(secs, mode="ocr")
+        run.count("pages")
+        out[i] = text
+        if keys[i]:
+            ocr_cache.put(keys[i], text)
+
+    def failed(i, e):
+        print(f"[OCR] page {i + 1} failed: {e}")
+        run.count("failed")
+
+    if not parallel:
+        for i in todo:
+            if run.remaining() <= 0:
+                run.count("skipped")
+                continue
+            try:
+                finish(i, _ocr_page(source, i, OCR_DPI, OCR_LANG, run.remaining()))
+            except Exception as e:
+                failed(i, e)
+        return out
+
+    from concurrent.futures.process import BrokenProcessPool
+    try:
+        pool = _get_ocr_pool()
+        futures = {pool.submit(_ocr_page, source, i, OCR_DPI, OCR_LANG, run.remaining()): i for i in todo}
+    except BrokenProcessPool as e:
+        _reset_ocr_pool()
+        for i in todo:
+            failed(i, e)
+        return out
+    done, not_done = wait(futures, timeout=max(0, run.remaining()))
+    for fut in not_done:
+        if not fut.cancel():
+            # already running: keep its text for the next attempt
+            fut.add_done_callback(lambda f, key=keys[futures[fut]]: _cache_late_ocr(key, f))
+    run.count("skipped", len(not_done))
+    for fut in done:
+        try:
+            finish(futures[fut], fut.result())
+        except BrokenProcessPool as e:
+            _reset_ocr_pool()
+            failed(futures[fut], e)
+        except Exception as e:
+            failed(futures[fut], e)
+    return out
+
+def _cache_late_ocr(key, fut):
+    if key and not fut.cancelled() and fut.exception() is None:
+        ocr_cache.put(key, fut.result()[0])
+
+def ocr_blank_pages(source, pages, run, parallel=True, start=0):
+    """OCR the pages of `pages` (page texts from `start` on) that have no text; updates the list in place."""
+    blank = [start + i for i, text in enumerate(pages) if not (text or "").strip()]
+    if blank:
+        for i, text in ocr_pages(source, blank, run, parallel).items():
+            pages[i - start] = text
+    return pages
+
+# -------------------- Debug capture --------------------
+# Off by default. When DEBUG_CAPTURE=1, or a request sends
+# "X-Debug-Capture: 1", the extracted text and line map of that request are
+# written under DEBUG_CAPTURE_DIR with a unique per-request prefix. Writes
+# happen on a background thread, so the request never waits on disk I/O.
+DEBUG_CAPTURE = os.getenv("DEBUG_CAPTURE", "0") == "1"
+DEBUG_CAPTURE_HEADER = "X-Debug-Capture"
+DEBUG_CAPTURE_DIR = os.getenv("DEBUG_CAPTURE_DIR", os.path.join(os.getcwd(), "debug_captures"))
+DEBUG_CAPTURE_MAX_BYTES = int(os.getenv("DEBUG_CAPTURE_MAX_BYTES", str(1024 * 1024)))
+DEBUG_CAPTURE_MAX_FILES = int(os.getenv("DEBUG_CAPTURE_MAX_FILES", "200"))
+
+class DebugCapture:
+    """
+    Background writer for debug artifacts. Items are (filename, content)
+    where content is a str or a zero-argument callable producing one, so
+    expensive formatting also runs off the request thread. Each file is
+    capped at max_bytes and only the newest max_files files are kept.
+    """
+
+    def __init__(self, directory, max_bytes, max_files, queue_size=64):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+
+    def submit(self, filename, content):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((filename, content))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Block until every queued item has been written."""
+        self._queue.join()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="debug-capture", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            filename, content = self._queue.get()
+            try:
+                self._write(filename, content)
+            except Exception as e:
+                print(f"[DEBUG] Could not write {filename}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, filename, content):
+        if callable(content):
+            content = content()
+        data = content.encode("utf-8")[:self.max_bytes]
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, filename), "wb") as f:
+            f.write(data)
+        self.written += 1
+        self._rotate()
+
+    def _rotate(self):
+        entries = [e for e in os.scandir(self.directory) if e.is_file()]
+        if len(entries) <= self.max_files:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for e in entries[:len(entries) - self.max_files]:
+            try:
+                os.remove(e.path)
+            except OSError:
+                pass
+
+debug_capture = DebugCapture(DEBUG_CAPTURE_DIR, DEBUG_CAPTURE_MAX_BYTES, DEBUG_CAPTURE_MAX_FILES)
+
+def debug_capture_id(req):
+    """Return a unique capture prefix when capture is on for this request, else None."""
+    header = req.headers.get(DEBUG_CAPTURE_HEADER, "")
+    if DEBUG_CAPTURE or header.lower() in ("1", "true", "yes"):
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:12]}"
+    return None
+
+def capture_debug_artifacts(capture_id, text):
+    debug_capture.submit(f"{capture_id}-extracted_text.txt", text)
+    debug_capture.submit(f"{capture_id}-line_map.txt", lambda: _format_line_map(_build_line_map(text)))
+
+# -------------------- Statement pipeline --------------------
+# Early-exit mode reads pages one at a time and stops as soon as every field
+# the parser can resolve has a value. Summary fields live on the first page
+# or two, so long statements rarely need more than PARSE_EARLY_EXIT_MAX_PAGES.
+# If the cap is reached first, the remaining pages are extracted and the full
+# text is parsed, exactly as in the default mode.
+PARSE_EARLY_EXIT = os.getenv("PARSE_EARLY_EXIT", "0") == "1"
+PARSE_EARLY_EXIT_MAX_PAGES = int(os.getenv("PARSE_EARLY_EXIT_MAX_PAGES", "3"))
+# Used when the issuer profile has no page hints. The generic rules don't
+# extract Annual Percentage Rate, so it does not hold back an early exit.
+EARLY_EXIT_FIELDS = (
+    "Total Balance Due", "Payment Due Date", "Minimum Payment Due", "Card Last 4 Digits",
+    "Billing Cycle Dates", "Previous Balance", "Payments, Credits", "Purchases",
+    "Interest Charged", "Credit Access Line", "Available Credit",
+)
+
+class StatementParseError(Exception):
+    """Raised for statements that cannot be parsed (reported as a 400)."""
+
+def _early_exit_plan(profile, max_pages=None):
+    """
+    Return (page cap, fields that must resolve) for early exit under
+    `profile`. The cap is max_pages when given, else PARSE_EARLY_EXIT_MAX_PAGES,
+    lowered to the last page the profile's page hints expect a field on.
+    """
+    cap = PARSE_EARLY_EXIT_MAX_PAGES if max_pages is None else max_pages
+    hints = profile.page_hints if profile is not None else None
+    if not hints:
+        return cap, EARLY_EXIT_FIELDS
+    return (min(cap, max(hints.values())) if max_pages is None else cap), tuple(hints)
+
+def _first_page_text(pages):
+    return next((p for p in pages if p and p.strip()), "")
+
+def parse_incremental(source, max_pages=None, parallel=True, profile=None, ocr=None):
+    """
+    Feed pages to parse_fields one at a time and stop extracting once all
+    fields the profile expects early are resolved. Falls back to a full scan
+    when the page cap is hit first. Without a profile the issuer is
+    fingerprinted from the first page with text. Blank pages are OCR'd
+    when an OcrRun is given.
+    A field counts as resolved once a rule has found it, before the final
+    clamp: the clamp drops some found values (dd/mm/yyyy dates become too
+    large a number), and reading more pages would not change them.
+    Returns (text, typed fields, profile); the fields are None for empty text.
+    """
+    cap, fields = _early_exit_plan(profile, max_pages)
+    pages = []
+    parsed = None
+    consumed = 0
+    page_iter = iter_pdf_pages(source, ocr=ocr, parallel=parallel)
+    try:
+        for ptext in page_iter:
+            consumed += 1
+            pages.append(ptext)
+            if ptext and ptext.strip():
+                if profile is None:
+                    profile = fingerprint_issuer(ptext)
+                    cap, fields = _early_exit_plan(profile, max_pages)
+                parsed = parse_fields(_join_pages(pages), profile, sanitize=False)
+                if all(parsed[k] is not None for k in fields):
+                    return _join_pages(pages), sanitize_fields(parsed), profile
+            if consumed >= cap:
+                break
+    finally:
+        page_iter.close()
+
+    rest = extract_pdf_pages(source, parallel, start=consumed, ocr=ocr)
+    if profile is None:
+        profile = fingerprint_issuer(_first_page_text(rest))
+    text = _join_pages(pages + rest)
+    if not text.strip():
+        return text, None, profile
+    if parsed is None or any(p is not None for p in rest):
+        return text, parse_fields(text, profile), profile
+    return text, sanitize_fields(parsed), profile
+
+def statement_cache_key(pdf_bytes, digest=None, issuer=None, layout=None):
+    profile = resolve_issuer(issuer)
+    layout = PARSE_LAYOUT if layout is None else layout
+    return ResultCache.make_key(pdf_bytes, "early" if PARSE_EARLY_EXIT else "full",
+                                profile.key if profile else "auto", *(["layout"] if layout else []),
+                                *(["ocr"] if PARSE_OCR else []), digest=digest)
+
+def parse_statement(source, parallel=True, capture_id=None, early_exit=None, issuer=None, layout=None, ocr=None):
+    """
+    Extract and parse one statement PDF (bytes or a file path).
+    Returns the {"data", "values", "issuer", "raw_sample"} payload served by
+    /api/parse: "data" holds the display strings and "values" the raw
+    numeric amounts (only sent to clients that ask for them).
+    An explicit issuer selects its profile; otherwise ("AUTO" or None) the
+    profile is fingerprinted from the first page.
+    With a capture_id the extracted text and line map are queued for the
+    debug capture writer. In layout mode (PARSE_LAYOUT or layout=True) the
+    payload also lists the fields that were resolved by position. With OCR
+    on (PARSE_OCR or ocr=True) blank pages are OCR'd and, if any were, the
+    payload carries the page counts under "ocr".
+    """
+    early_exit = PARSE_EARLY_EXIT if early_exit is None else early_exit
+    layout = PARSE_LAYOUT if layout is None else layout
+    ocr_run = OcrRun() if (PARSE_OCR if ocr is None else ocr) else None
+    profile = resolve_issuer(issuer)
+    layout_found = None
+    if layout:
+        with span("extract_layout"):
+            text, parsed, profile, layout_found = parse_layout(source, parallel=parallel, profile=profile, ocr=ocr_run)
+    elif early_exit:
+        with span("extract_incremental"):
+            text, parsed, profile = parse_incremental(source, parallel=parallel, profile=profile, ocr=ocr_run)
+    else:
+        with span("extract"):
+            pages = extract_pdf_pages(source, parallel, ocr=ocr_run)
+        text, parsed = _join_pages(pages), None
+        if profile is None:
+            with span("fingerprint"):
+                profile = fingerprint_issuer(_first_page_text(pages))
+
+    if capture_id:
+        capture_debug_artifacts(capture_id, text)
+
+    if not text.strip():
+        if ocr_run is None:
+            raise StatementParseError("Could not extract text from PDF. If this is scanned image PDF, enable OCR.")
+        if not ocr_available():
+            raise StatementParseError("Could not extract text from PDF: OCR is enabled but Tesseract is not installed.")
+        if ocr_run.skipped:
+            raise StatementParseError("Could not extract text from PDF: OCR did not finish within the time budget.")
+        raise StatementParseError("Could not extract text from PDF, even with OCR.")
+
+    if parsed is None:
+        with span("parse"):
+            parsed = parse_fields(text, profile)
+    result = {"data": format_fields(parsed), "values": field_values(parsed), "issuer": profile.key, "raw_sample": text[:6000]}
+    if layout_found is not None:
+        result["layout_fields"] = layout_found
+    if ocr_run is not None and any(ocr_run.summary().values()):
+        result["ocr"] = ocr_run.summary()
+    return result
+
+def cache_statement(cache_key, result):
+    """Store a parse result, unless OCR was cut short and a retry could read more pages."""
+    ocr = result.get("ocr")
+    if ocr and (ocr["skipped"] or ocr["failed"]):
+        return
+    parse_cache.put(cache_key, result)
+
+# -------------------- Batch parsing --------------------
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", str(os.cpu_count() or 1)))
+
+def _parse_batch_item(pdf_bytes):
+    """Process-pool worker: returns (result, error, elapsed_ms) for one PDF."""
+    started = time.perf_counter()
+    try:
+        result, error = parse_statement(pdf_bytes, parallel=False), None
+    except StatementParseError as e:
+        result, error = None, str(e)
+    except Exception as e:
+        result, error = None, f"An error occurred while parsing the PDF: {str(e)}"
+    return result, error, round((time.perf_counter() - started) * 1000, 2)
+
+def _batch_record(name, result, error, elapsed_ms, cached=False):
+    record = {"file": name, "ok": error is None, "elapsed_ms": elapsed_ms, "cached": cached}
+    if error is None:
+        record["issuer"] = result.get("issuer")
+        record["data"] = result["data"]
+    else:
+        record["error"] = error
+    return record
+
+def iter_batch_results(items, workers=None):
+    """
+    Parse (name, pdf_bytes_or_error) pairs with at most `workers` PDFs in
+    flight and yield one result record per file as soon as it finishes.
+    `items` is consumed lazily, so only the in-flight PDFs are held in memory.
+    A str in place of the bytes is reported as that file's error.
+    """
+    workers = max(1, workers or BATCH_WORKERS)
+    started = time.perf_counter()
+    summary = {"files": 0, "ok": 0, "errors": 0, "cached": 0}
+
+    def account(record):
+        summary["files"] += 1
+        summary["ok" if record["ok"] else "errors"] += 1
+        summary["cached"] += int(record["cached"])
+        return record
+
+    with _process_pool(workers) as pool:
+        pending = {}
+        for name, payload in items:
+            if isinstance(payload, str):
+                yield account(_batch_record(name, None, payload, 0.0))
+                continue
+            cache_key = statement_cache_key(payload)
+            cached = parse_cache.get(cache_key)
+            if cached is not None:
+                yield account(_batch_record(name, cached, None, 0.0, cached=True))
+                continue
+            pending[pool.submit(_parse_batch_item, payload)] = (name, cache_key)
+            if len(pending) >= workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    yield account(_finish_batch_future(fut, *pending.pop(fut)))
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield account(_finish_batch_future(fut, *pending.pop(fut)))
+
+    summary["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    yield {"summary": summary}
+
+def _finish_batch_future(fut, name, cache_key):
+    try:
+        result, error, elapsed_ms = fut.result()
+    except Exception as e:
+        return _batch_record(name, None, f"Worker failed: {str(e)}", 0.0)
+    if error is None:
+        cache_statement(cache_key, result)
+    return _batch_record(name, result, error, elapsed_ms)
+
+# errors reading one zip member (corrupt data, bad CRC, encryption,
+# unsupported compression, truncation); the other members are still read
+_ZIP_MEMBER_ERRORS = (zipfile.BadZipFile, zlib.error, RuntimeError, NotImplementedError, EOFError)
+
+def _iter_zip_pdfs(fileobj, archive):
+    try:
+        zf = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile:
+        yield archive, "Invalid zip archive."
+        return
+    with zf:
+        for info in zf.infolist():
+            name = info.filename
+            if info.is_dir() or name.startswith("__MACOSX/") or not name.lower().endswith(".pdf"):
+                continue
+            if info.file_size > MAX_UPLOAD_BYTES:
+                yield name, f"File too large. The limit is {_format_mb(MAX_UPLOAD_BYTES)}."
+                continue
+            try:
+                data = zf.read(info)
+            except _ZIP_MEMBER_ERRORS as e:
+                yield name, f"Could not read file from the zip archive: {e}"
+                continue
+            yield name, data
+
+def _iter_uploaded_pdfs(files):
+    for file in files:
+        name = file.filename or ""
+        lower = name.lower()
+        if lower.endswith(".zip"):
+            yield from _iter_zip_pdfs(file.stream, name)
+        elif lower.endswith(".pdf"):
+            if getattr(file.stream, "size", 0) > MAX_UPLOAD_BYTES:
+                yield name, f"File too large. The limit is {_format_mb(MAX_UPLOAD_BYTES)}."
             else:
-                if k in ["Purchases", "Minimum Payment Due", "Interest Charged"]:
-                    fields[k] = s if re.search(r"\d", s) else ("₹0.00" if k in ["Purchases", "Interest Charged"] else "N/A")
-                else:
-                    fields[k] = "N/A"
+                yield name, file.read()
+        else:
+            yield name, "Invalid file type. Please upload a PDF file."
+
+def _iter_directory_pdfs(root):
+    for dirpath, _, filenames in os.walk(root):
+        for fn in sorted(filenames):
+            if not fn.lower().endswith(".pdf"):
+                continue
+            path = os.path.join(dirpath, fn)
+            try:
+                with open(path, "rb") as f:
+                    yield path, f.read()
+            except OSError as e:
+                yield path, f"Could not read file: {e}"
+
+def run_batch_cli(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog="main.py batch", description="Parse every PDF under a directory and write NDJSON results.")
+    parser.add_argument("directory")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--output", "-o", help="write NDJSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for record in iter_batch_results(_iter_directory_pdfs(args.directory), args.workers):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+# -------------------- Transactions --------------------
+# Line items are read from pdfplumber word boxes: words are grouped into
+# visual rows by their vertical position, and a row is a transaction when it
+# starts with a date and ends with an amount (optionally followed by a Cr/Dr
+# marker). Rows are yielded page by page so callers can stream them.
+TXN_COLUMNS = ("page", "date", "description", "amount", "type")
+_RE_TXN_AMOUNT = re.compile(r"^\(?-?(?:₹|Rs\.?|INR|\$)?\d[\d,]*(?:\.\d{1,2})?\)?$", re.IGNORECASE)
+_RE_CURRENCY_WORD = re.compile(r"^(?:₹|Rs\.?|INR|\$|USD)$", re.IGNORECASE)
+_RE_HAS_LETTER = re.compile(r"[A-Za-z]")
+_CREDIT_MARKERS = {"cr", "cr.", "credit"}
+_DEBIT_MARKERS = {"dr", "dr.", "debit"}
+
+def _amount_value(token):
+    s = _RE_NON_NUMERIC.sub("", token)
+    m = _RE_NUMERIC_PART.search(s.replace("(", "").replace(")", ""))
+    if not m:
+        return None
+    try:
+        return abs(float(m.group(1).replace(",", "")))
+    except ValueError:
+        return None
+
+def _iter_word_rows(page, y_tolerance=3):
+    words = page.extract_words()
+    words.sort(key=lambda w: (w["top"], w["x0"]))
+    row, row_top = [], None
+    for w in words:
+        if row and abs(w["top"] - row_top) > y_tolerance:
+            yield sorted(row, key=lambda w: w["x0"])
+            row = []
+        if not row:
+            row_top = w["top"]
+        row.append(w)
+    if row:
+        yield sorted(row, key=lambda w: w["x0"])
+
+def _parse_transaction_row(tokens):
+    """Return (date, description, amount, type) for a transaction row, else None."""
+    text = " ".join(tokens)
+    date = _find_date_in_line(text)
+    if not date or not text.startswith(date):
+        return None
+    tokens = tokens[len(date.split()):]
+    kind = "credit" if tokens and tokens[0].startswith("-") else "debit"
+    if tokens and tokens[-1].lower() in _CREDIT_MARKERS | _DEBIT_MARKERS:
+        kind = "credit" if tokens.pop().lower() in _CREDIT_MARKERS else "debit"
+    if not tokens or not _RE_TXN_AMOUNT.match(tokens[-1]):
+        return None
+    amount_token = tokens.pop()
+    if amount_token.startswith("-") or amount_token.startswith("("):
+        kind = "credit"
+    if tokens and _RE_CURRENCY_WORD.match(tokens[-1]):
+        tokens.pop()
+    description = " ".join(tokens)
+    amount = _amount_value(amount_token)
+    # summary value rows ("<date> Rs. 2,622.36 Rs. 121.15") are not
+    # transactions: the description needs a word besides currencies and amounts
+    words = [t for t in tokens if not (_RE_CURRENCY_WORD.match(t) or _RE_TXN_AMOUNT.match(t))]
+    if amount is None or not _RE_HAS_LETTER.search(" ".join(words)):
+        return None
+    return date, description, amount, kind
+
+def iter_transactions(source):
+    """
+    Yield one dict per transaction row ({column: value} for TXN_COLUMNS)
+    page by page, releasing each page's layout cache as it goes.
+    """
+    for page_no, rows in iter_transaction_pages(source):
+        for date, description, amount, kind in rows:
+            yield {"page": page_no, "date": date, "description": description, "amount": amount, "type": kind}
+
+def iter_transaction_pages(source):
+    """Yield (page number, [(date, description, amount, type), ...]) per page."""
+    with open_pdf(source) as pdf:
+        for page_no, page in enumerate(pdf.pages, 1):
+            try:
+                rows = []
+                for words in _iter_word_rows(page):
+                    row = _parse_transaction_row([w["text"] for w in words])
+                    if row:
+                        rows.append(row)
+                yield page_no, rows
+            except Exception:
+                continue
+            finally:
+                page.close()
+
+def iter_transaction_columns(source):
+    """Yield one column-oriented batch ({column: [values]}) per page that has transactions."""
+    for page_no, rows in iter_transaction_pages(source):
+        if not rows:
             continue
-        numstr = re.sub(r"[^\d\.]", "", s)
-        try:
-            if numstr != "":
-                valf = float(numstr)
-                if valf < 0 or valf > 10_000_000:
-                    fields[k] = "N/A"
+        dates, descriptions, amounts, kinds = (list(col) for col in zip(*rows))
+        yield {"page": page_no, "date": dates, "description": descriptions, "amount": amounts, "type": kinds}
+
+def write_transactions_parquet(source, path):
+    """Write transactions to a local Parquet file, one row group per page. Requires pyarrow."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow).")
+    schema = pa.schema([
+        ("page", pa.int32()), ("date", pa.string()), ("description", pa.string()),
+        ("amount", pa.float64()), ("type", pa.dictionary(pa.int8(), pa.string())),
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in iter_transaction_columns(source):
+            n = len(batch["date"])
+            batch = dict(batch, page=[batch["page"]] * n)
+            writer.write_table(pa.Table.from_pydict(batch, schema=schema))
+            count += n
+    return count
+
+def run_transactions_cli(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog="main.py transactions", description="Extract transaction rows from a statement PDF.")
+    parser.add_argument("pdf")
+    parser.add_argument("--parquet", help="write a Parquet file here instead of NDJSON to stdout")
+    args = parser.parse_args(argv)
+
+    if args.parquet:
+        count = write_transactions_parquet(args.pdf, args.parquet)
+        print(f"Wrote {count} transactions to {args.parquet}")
+        return
+    for row in iter_transactions(args.pdf):
+        sys.stdout.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+# -------------------- Layout-aware extraction --------------------
+# With PARSE_LAYOUT=1 (or ?layout=1) the summary pages are read as word boxes
+# instead of flattened text. Each page's words are indexed by row and by x
+# position (WordGrid), and every label in the profile's layout_labels is
+# resolved geometrically: the value just right of it on the same row, else
+# the value in its column on one of the next rows. A header row of labels
+# followed by a row with one value per label is paired first, since table
+# values often don't sit under their own headers: in the profile's
+# summary_columns order for the Account Summary header, in reading order
+# otherwise. When a header's value count doesn't match its labels, or a
+# column holds more than one candidate value, those labels are left to the
+# text rules rather than guessed. Fields found this way are handed to
+# parse_fields as presets, so the text rules only run for the rest.
+PARSE_LAYOUT = os.getenv("PARSE_LAYOUT", "0") == "1"
+LAYOUT_MAX_ROWS_BELOW = int(os.getenv("LAYOUT_MAX_ROWS_BELOW", "3"))
+LAYOUT_COLUMN_TOLERANCE = 8.0  # points a value may sit outside its header's x-span
+_RE_LAYOUT_PUNCT = re.compile(r"^[:\-–|]+$")
+
+class WordGrid:
+    """
+    Spatial index over one page's words (extract_words dicts) grouped into
+    visual rows. Rows are kept top to bottom and the words of each row left
+    to right, with their x0 and x1 in parallel sorted lists, so finding the
+    words of a row that overlap an x-range is a bisect.
+    """
+    __slots__ = ("rows", "texts", "offsets", "x0s", "x1s")
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.texts, self.offsets, self.x0s, self.x1s = [], [], [], []
+        for row in rows:
+            offsets, pos = [], 0
+            for w in row:
+                offsets.append(pos)
+                pos += len(w["text"]) + 1
+            self.offsets.append(offsets)
+            self.texts.append(" ".join(w["text"] for w in row))
+            self.x0s.append([w["x0"] for w in row])
+            self.x1s.append([w["x1"] for w in row])
+
+    def find(self, regex):
+        """Yield (row, first word, last word) for each match of regex, top to bottom."""
+        for r, text in enumerate(self.texts):
+            offsets = self.offsets[r]
+            for m in regex.finditer(text):
+                yield r, bisect_right(offsets, m.start()) - 1, bisect_right(offsets, m.end() - 1) - 1
+
+    def overlapping(self, r, x0, x1):
+        """Indices of the words in row r that overlap [x0, x1] horizontally."""
+        return range(bisect_left(self.x1s[r], x0), bisect_right(self.x0s[r], x1))
+
+def _layout_labels(grid, profile):
+    """
+    Claim label occurrences on the page in layout_labels order. Returns
+    ({field: [(row, first, last), ...]}, {row: [(x centre, field), ...]},
+    the set of (row, word) positions that belong to a label).
+    """
+    taken = set()
+    by_field, by_row = {}, {}
+    for field, _, regexes in profile.layout_labels:
+        for rg in regexes:
+            for r, first, last in grid.find(rg):
+                words = {(r, i) for i in range(first, last + 1)}
+                if words & taken:
                     continue
-        except:
-            pass
-        if re.fullmatch(r"[A-Za-z]", s):
-            fields[k] = "N/A"
+                taken |= words
+                by_field.setdefault(field, []).append((r, first, last))
+                row = grid.rows[r]
+                by_row.setdefault(r, []).append(((row[first]["x0"] + row[last]["x1"]) / 2, field))
+    return by_field, by_row, taken
+
+def _layout_value_at(grid, kind, r, i, claimed):
+    """(value, word indices) when the words of row r starting at i form a value of `kind`, else None."""
+    row = grid.rows[r]
+    if (r, i) in claimed:
+        return None
+    text = row[i]["text"]
+    if kind == "date":
+        if _RE_NUMERIC_DATE.fullmatch(text):
+            return text, (i,)
+        joined = " ".join(w["text"] for w in row[i:i + 3])
+        return (joined, (i, i + 1, i + 2)) if _RE_WORD_DATE.fullmatch(joined) else None
+    if not _RE_TXN_AMOUNT.match(text):
+        return None
+    if i > 0 and _RE_CURRENCY_WORD.match(row[i - 1]["text"]):
+        text = f"{row[i - 1]['text']} {text}"
+    value = _clean_numeric_token(text)
+    return (value, (i,)) if isinstance(value, Money) else None
+
+def _layout_resolve(grid, field, kind, r, first, last, label_words, label_rows, claimed):
+    """Value for one label occurrence: same row to the right first, then its column below."""
+    row = grid.rows[r]
+    for i in range(last + 1, len(row)):
+        if (r, i) in label_words:
+            break
+        found = _layout_value_at(grid, kind, r, i, claimed)
+        if found:
+            return found[0], [(r, j) for j in found[1]]
+        if not (_RE_CURRENCY_WORD.match(row[i]["text"]) or _RE_LAYOUT_PUNCT.match(row[i]["text"])):
+            break
+    x0, x1 = row[first]["x0"], row[last]["x1"]
+    for below in range(r + 1, min(r + 1 + LAYOUT_MAX_ROWS_BELOW, len(grid.rows))):
+        candidates = grid.overlapping(below, x0 - LAYOUT_COLUMN_TOLERANCE, x1 + LAYOUT_COLUMN_TOLERANCE)
+        if any((below, i) in label_words for i in candidates):
+            break
+        hits = []
+        for i in candidates:
+            found = _layout_value_at(grid, kind, below, i, claimed)
+            if not found:
+                continue
+            w = grid.rows[below][found[1][-1]]
+            mid = (grid.rows[below][i]["x0"] + w["x1"]) / 2
+            # the value belongs to whichever label of the header row is closest
+            if min(label_rows[r], key=lambda lab: abs(lab[0] - mid))[1] != field:
+                continue
+            hits.append((found[0], [(below, j) for j in found[1]]))
+        if hits:
+            # several values under one label: leave it to the text rules
+            return hits[0] if len(hits) == 1 else None
+    return None
+
+def _layout_table_row(grid, r, labels, kinds, label_words, claimed, columns=None):
+    """
+    Pair a header row of labels with the value row under it. Applies only
+    when row r holds labels and no values. A header carrying exactly the
+    profile's summary_columns labels is paired in summary_columns order
+    (the values of such tables don't follow the header order); a header
+    with only some of them is left to the per-column search, and any other
+    header is paired in reading order. Returns [(field, value, words), ...],
+    [] when row r is not paired here, and None when it is a table header
+    whose value count or kinds don't match its labels.
+    """
+    row = grid.rows[r]
+    if any((r, i) not in label_words and _layout_value_at(grid, "amount", r, i, claimed) for i in range(len(row))):
+        return []
+    fields = [f for _, f in labels]
+    summary = [f for f in fields if f in (columns or ())]
+    if set(fields) == set(columns or ()) and len(fields) == len(columns):
+        fields = list(columns)
+    elif len(summary) > 1:
+        return []
+    for below in range(r + 1, min(r + 1 + LAYOUT_MAX_ROWS_BELOW, len(grid.rows))):
+        words = grid.rows[below]
+        if any((below, i) in label_words for i in range(len(words))):
+            return []
+        cells, i = [], 0
+        while i < len(words):
+            for kind in ("date", "amount"):
+                found = _layout_value_at(grid, kind, below, i, claimed)
+                if found:
+                    cells.append((kind, found[0], [(below, j) for j in found[1]]))
+                    i = found[1][-1] + 1
+                    break
+            else:
+                if not (_RE_CURRENCY_WORD.match(words[i]["text"]) or _RE_LAYOUT_PUNCT.match(words[i]["text"])):
+                    return []
+                i += 1
+        if not cells:
             continue
-        fields[k] = s
+        if len(cells) != len(fields) or any(kinds[f] != c[0] for f, c in zip(fields, cells)):
+            return None
+        return [(f, c[1], c[2]) for f, c in zip(fields, cells)]
+    return []
 
-    return fields
+def layout_fields(grid, profile, found=None):
+    """
+    Resolve the profile's layout labels on one page. Fields already in
+    `found` are skipped; the dict is updated in place and returned. Labels
+    on a table header that can't be paired are left to the text rules.
+    """
+    found = {} if found is None else found
+    by_field, by_row, label_words = _layout_labels(grid, profile)
+    kinds = {field: kind for field, kind, _ in profile.layout_labels}
+    claimed, unpaired = set(), set()
+    for r in sorted(by_row):
+        if len(by_row[r]) < 2:
+            continue
+        pairs = _layout_table_row(grid, r, sorted(by_row[r]), kinds, label_words, claimed, profile.summary_columns)
+        if pairs is None:
+            unpaired.add(r)
+            continue
+        for field, value, words in pairs:
+            claimed.update(words)
+            found.setdefault(field, value)
+    for field, kind, _ in profile.layout_labels:
+        if field in found:
+            continue
+        for r, first, last in by_field.get(field, ()):
+            if r in unpaired:
+                continue
+            hit = _layout_resolve(grid, field, kind, r, first, last, label_words, by_row, claimed)
+            if hit:
+                found[field] = hit[0]
+                claimed.update(hit[1])
+                break
+    return found
+
+def parse_layout(source, parallel=True, profile=None, max_pages=None, ocr=None):
+    """
+    Layout-aware parse: the first pages (the early-exit page cap) are read
+    once as word boxes and resolved with layout_fields, the remaining pages
+    as plain text, and parse_fields fills whatever layout did not find.
+    With an OcrRun, blank pages are OCR'd and only read as text.
+    Returns (text, typed fields, profile, names of the fields found by layout).
+    """
+    cap, _ = _early_exit_plan(profile, max_pages)
+    pages, found = [], {}
+    with open_pdf(source) as pdf:
+        for page in pdf.pages:
+            if len(pages) >= cap or (profile is not None and len(found) == len(profile.layout_labels)):
+                break
+            started = time.perf_counter()
+            try:
+                grid = WordGrid(list(_iter_word_rows(page)))
+            except Exception:
+                grid = None
+            finally:
+                page.close()
+            PAGE_SECONDS.observe(time.perf_counter() - started, mode="layout")
+            if grid is None:
+                pages.append(None)
+                continue
+            pages.append(_clean_page_text("\n".join(grid.texts)))
+            if profile is None and pages[-1].strip():
+                profile = fingerprint_issuer(pages[-1])
+                cap, _ = _early_exit_plan(profile, max_pages)
+            layout_fields(grid, profile or GENERIC_PROFILE, found)
+    if ocr is not None:
+        ocr_blank_pages(source, pages, ocr, parallel)
+    rest = extract_pdf_pages(source, parallel, start=len(pages), ocr=ocr)
+    if profile is None:
+        profile = fingerprint_issuer(_first_page_text(pages + rest))
+    text = _join_pages(pages + rest)
+    if not text.strip():
+        return text, None, profile, []
+    return text, parse_fields(text, profile, preset=found), profile, sorted(found)
+
+# -------------------- Analytics --------------------
+# /api/analytics summarises many parsed statements (and optionally their
+# transaction rows) without any network call. The formatted amounts
+# ("₹12,345.00") are converted to float columns in one pass; month-over-month
+# spend, utilization (Purchases / Credit Access Line), the interest trend and
+# budget variance are then computed column-wise. Dates repeat heavily across
+# statements, so only the distinct date strings are parsed. numpy and pandas
+# are imported on first use.
+ANALYTICS_AMOUNT_FIELDS = (
+    ("purchases", "Purchases"), ("interest", "Interest Charged"),
+    ("total_due", "Total Balance Due"), ("credit_limit", "Credit Access Line"),
+)
+_MONTH_NUMBERS = {m: i for i, m in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1)}
+_RE_DATE_PARTS = re.compile(r"(\d{1,2})[\/\-](\d{1,2})[\/\-](\d{2,4})")
+_RE_WORD_DATE_PARTS = re.compile(r"([A-Za-z]{3,9})\s+\d{1,2},\s*(\d{4})")
+_RE_YEAR_MONTH = re.compile(r"^(\d{4})-(\d{1,2})$")
+_NAN = float("nan")
+
+def _import_pandas():
+    try:
+        import numpy as np
+        import pandas as pd
+    except ImportError:
+        raise RuntimeError("Analytics requires numpy and pandas (pip install numpy pandas).")
+    return np, pd
+
+def _money_values(pd, values):
+    """Formatted amounts -> float64 array; NaN for "N/A", blanks and junk."""
+    s = pd.Series(values, dtype="string").str.replace(",", "", regex=False).str.lstrip(" ₹$Rs.INR")
+    s = s.where(s.str.match(r"-?\d", na=False))
+    try:
+        return s.astype("float64").to_numpy()
+    except (TypeError, ValueError):
+        return pd.to_numeric(s, errors="coerce").astype("float64").to_numpy()
+
+def _date_periods(text):
+    """(yyyymm read day-first, yyyymm read month-first) for the first date in text."""
+    m = _RE_YEAR_MONTH.match(text)
+    if m:
+        period = int(m.group(1)) * 100 + int(m.group(2)) if 1 <= int(m.group(2)) <= 12 else _NAN
+        return period, period
+    m = _RE_DATE_PARTS.search(text)
+    if m:
+        a, b, year = (int(x) for x in m.groups())
+        year = year + 2000 if year < 100 else year
+        return (year * 100 + b if 1 <= b <= 12 else _NAN), (year * 100 + a if 1 <= a <= 12 else _NAN)
+    m = _RE_WORD_DATE_PARTS.search(text)
+    if m and m.group(1)[:3].lower() in _MONTH_NUMBERS:
+        period = int(m.group(2)) * 100 + _MONTH_NUMBERS[m.group(1)[:3].lower()]
+        return period, period
+    return _NAN, _NAN
+
+def _period_values(np, pd, dates, month_first=False):
+    """yyyymm per date string as a float array (NaN when there is no date)."""
+    codes, uniques = pd.factorize(pd.Series(dates, dtype=object))
+    # one extra slot at the end so missing values (code -1) map to NaN
+    by_day = np.full(len(uniques) + 1, np.nan)
+    by_month = np.full(len(uniques) + 1, np.nan)
+    for i, value in enumerate(uniques):
+        by_day[i], by_month[i] = _date_periods(str(value))
+    return np.where(month_first, by_month[codes], by_day[codes])
+
+def _statement_frame(np, pd, statements):
+    """One row per statement: the amount columns plus its yyyymm period."""
+    month_first = {key: p.month_first for key, p in ISSUER_PROFILES.items()}
+    fields = [field for _, field in ANALYTICS_AMOUNT_FIELDS]
+    amounts, dates, first = [], [], []
+    for st in statements:
+        st = st if isinstance(st, dict) else {}
+        data = st.get("data") if isinstance(st.get("data"), dict) else st
+        amounts.extend(map(data.get, fields))
+        # an explicit "month" (YYYY-MM) wins over the dates in the statement
+        billing = data.get("Billing Cycle Dates")
+        dates.append(st.get("month") or (billing if billing not in (None, "N/A") else data.get("Payment Due Date")))
+        first.append(month_first.get(st.get("issuer"), False))
+    columns = _money_values(pd, amounts).reshape(-1, len(ANALYTICS_AMOUNT_FIELDS))
+    df = pd.DataFrame(columns, columns=[name for name, _ in ANALYTICS_AMOUNT_FIELDS])
+    df["period"] = _period_values(np, pd, dates, np.array(first, dtype=bool))
+    return df
+
+def _transaction_frame(np, pd, transactions):
+    """Amount, credit flag and period per transaction, from rows or per-page column batches."""
+    dates, amounts, credit = [], [], []
+    for item in transactions:
+        if not isinstance(item, dict):
+            continue
+        if isinstance(item.get("date"), list):
+            n = len(item["date"])
+            dates.extend(item["date"])
+            amounts.extend(item.get("amount") or [None] * n)
+            credit.extend(k == "credit" for k in (item.get("type") or ["debit"] * n))
+        else:
+            dates.append(item.get("date"))
+            amounts.append(item.get("amount"))
+            credit.append(item.get("type") == "credit")
+    return pd.DataFrame({
+        "period": _period_values(np, pd, dates),
+        "amount": np.abs(_money_values(pd, amounts)),
+        "credit": np.array(credit, dtype=bool),
+    })
+
+def _json_number(value, digits=2):
+    if value is None:
+        return None
+    value = float(value)
+    return None if value != value else round(value, digits)
+
+def compute_analytics(statements, transactions=(), budget_goal=None):
+    """Summarise parsed statements and transaction rows by statement month."""
+    np, pd = _import_pandas()
+    started = time.perf_counter()
+    st = _statement_frame(np, pd, statements)
+    tx = _transaction_frame(np, pd, transactions)
+
+    dated = st[st["period"].notna()]
+    both = dated["purchases"].notna() & (dated["credit_limit"] > 0)
+    grouped = dated.groupby("period")
+    monthly = grouped[["purchases", "interest", "total_due"]].sum(min_count=1)
+    monthly.insert(0, "statements", grouped.size())
+    util = dated[both].groupby("period")[["purchases", "credit_limit"]].sum()
+    monthly["utilization_pct"] = util["purchases"] / util["credit_limit"] * 100
+
+    tx_rows = int(len(tx))
+    tx = tx[tx["period"].notna()]
+    if len(tx):
+        debits = tx[~tx["credit"]].groupby("period")["amount"].sum()
+        monthly = monthly.join(debits.rename("transaction_spend"), how="outer")
+        monthly["statements"] = monthly["statements"].fillna(0)
+    else:
+        monthly["transaction_spend"] = np.nan
+    monthly = monthly.sort_index()
+    # transaction totals are the better spend figure when they exist
+    monthly["spend"] = monthly["transaction_spend"].fillna(monthly["purchases"])
+    monthly["spend_change_pct"] = monthly["spend"].pct_change() * 100
+
+    budget = _money_values(pd, [budget_goal])[0] if budget_goal not in (None, "") else np.nan
+    if budget == budget:
+        monthly["budget_variance"] = budget - monthly["spend"]
+
+    ratios = (st["purchases"] / st["credit_limit"].where(st["credit_limit"] > 0)) * 100
+    interest = monthly["interest"].dropna()
+    trend = {"months": int(len(interest)), "slope_per_month": None, "direction": None}
+    if len(interest) >= 2:
+        idx = (interest.index // 100) * 12 + interest.index % 100
+        slope = float(np.polyfit(idx.to_numpy(dtype=float), interest.to_numpy(), 1)[0])
+        scale = abs(float(interest.mean())) or 1.0
+        trend["slope_per_month"] = round(slope, 2)
+        trend["direction"] = "flat" if abs(slope) < 0.01 * scale else ("rising" if slope > 0 else "falling")
+
+    months = []
+    for period, row in zip(monthly.index, monthly.to_dict("records")):
+        entry = {"month": f"{int(period) // 100:04d}-{int(period) % 100:02d}", "statements": int(row["statements"])}
+        for key in ("purchases", "transaction_spend", "spend", "spend_change_pct", "interest",
+                    "total_due", "utilization_pct", "budget_variance"):
+            if key in row:
+                entry[key] = _json_number(row[key])
+        months.append(entry)
+
+    result = {
+        "statements": {"received": len(statements), "with_month": int(len(dated))},
+        "transactions": {"rows": tx_rows, "with_month": int(len(tx))},
+        "months": months,
+        "utilization": {
+            "mean_pct": _json_number(ratios.mean()),
+            "max_pct": _json_number(ratios.max()),
+            "statements_over_30_pct": int((ratios > 30).sum()),
+        },
+        "interest_trend": trend,
+        "budget": None,
+    }
+    if budget == budget:
+        variance = monthly["budget_variance"].dropna()
+        result["budget"] = {
+            "monthly_goal": _json_number(budget),
+            "months_over_budget": int((variance < 0).sum()),
+            "average_variance": _json_number(variance.mean()) if len(variance) else None,
+        }
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+# -------------------- Async parse jobs --------------------
+# POST /api/parse?async=1 hands the upload to a small pool of background
+# threads and returns a job id straight away, so large statements don't hold
+# a request worker. GET /api/jobs/<id> reports the status, timings and, once
+# finished, the result. The queue is bounded by PARSE_JOB_QUEUE_SIZE and a
+# full queue is answered with a 429. Finished jobs are forgotten
+# PARSE_JOB_TTL seconds after they complete. Under a multi-process server,
+# PARSE_JOB_DB names a SQLite file through which every process can report
+# on jobs that another one is running.
+PARSE_JOB_WORKERS = int(os.getenv("PARSE_JOB_WORKERS", "2"))
+PARSE_JOB_QUEUE_SIZE = int(os.getenv("PARSE_JOB_QUEUE_SIZE", "32"))
+PARSE_JOB_TTL = float(os.getenv("PARSE_JOB_TTL", "900"))
+PARSE_JOB_DB = os.getenv("PARSE_JOB_DB") or None
+
+class JobQueueFull(Exception):
+    """Raised by ParseJobQueue.submit when no more jobs can be queued."""
+
+class ParseJobQueue:
+    """
+    Bounded in-process job queue served by `workers` daemon threads. A job
+    is a zero-argument callable whose return value becomes the result; an
+    optional cleanup callable runs after it either way (e.g. to close the
+    upload it reads from). With db_path, every status change is also
+    written to a SQLite table that get() falls back to for unknown ids.
+    """
+
+    def __init__(self, workers, max_queued, ttl, db_path=None):
+        self.workers = workers
+        self.ttl = ttl
+        self.db_path = db_path
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = {}
+        self._threads = []
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self.counts = {"done": 0, "failed": 0, "rejected": 0}
+        if db_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS parse_jobs ("
+                    "id TEXT PRIMARY KEY, job TEXT NOT NULL, finished_at REAL)"
+                )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _publish(self, job):
+        if not self.db_path:
+            return
+        with self._lock:
+            snapshot = dict(job)
+        try:
+            with self._connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO parse_jobs (id, job, finished_at) VALUES (?, ?, ?)",
+                             (snapshot["id"], json.dumps(snapshot), snapshot["finished_at"]))
+        except sqlite3.Error as e:
+            print(f"[JOBS] could not publish job {snapshot['id']}: {e}")
+
+    def _lookup(self, job_id):
+        if not self.db_path:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT job FROM parse_jobs WHERE id = ?", (job_id,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"[JOBS] job lookup failed: {e}")
+            return None
+        if row is None:
+            return None
+        job = json.loads(row[0])
+        if job["finished_at"] is not None and time.time() - job["finished_at"] > self.ttl:
+            return None
+        return job
+
+    def drain(self, timeout):
+        """
+        Wait up to `timeout` seconds for queued and running jobs to finish.
+        Returns True if the queue emptied in time.
+        """
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def submit(self, fn, cleanup=None):
+        """Queue fn and return the new job id. Raises JobQueueFull."""
+        self._ensure_started()
+        job = self._new_job("queued")
+        try:
+            self._queue.put_nowait((job, fn, cleanup))
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job["id"], None)
+                self.counts["rejected"] += 1
+            raise JobQueueFull()
+        self._publish(job)
+        return job["id"]
+
+    def completed(self, result):
+        """Record an already-finished job (e.g. a cache hit) and return its id."""
+        job = self._new_job("done")
+        job["started_at"] = job["finished_at"] = job["created_at"]
+        job["result"] = result
+        with self._lock:
+            self.counts["done"] += 1
+        self._publish(job)
+        return job["id"]
+
+    def get(self, job_id):
+        """Return a snapshot of the job as served by /api/jobs/<id>, or None."""
+        self._sweep()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job = dict(job)
+        if job is None:
+            job = self._lookup(job_id)
+            if job is None:
+                return None
+        now = time.time()
+        started, finished = job.pop("started_at"), job.pop("finished_at")
+        job["queued_ms"] = round(((started or now) - job["created_at"]) * 1000, 2)
+        job["run_ms"] = round(((finished or now) - started) * 1000, 2) if started else None
+        return job
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def _new_job(self, status):
+        job = {"id": uuid.uuid4().hex, "status": status, "created_at": time.time(),
+               "started_at": None, "finished_at": None}
+        self._sweep()
+        with self._lock:
+            self._jobs[job["id"]] = job
+        return job
+
+    def _sweep(self):
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep < 1.0:
+                return
+            self._last_sweep = now
+            expired = [jid for jid, job in self._jobs.items()
+                       if job["finished_at"] is not None and now - job["finished_at"] > self.ttl]
+            for jid in expired:
+                del self._jobs[jid]
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM parse_jobs WHERE finished_at < ?", (now - self.ttl,))
+            except sqlite3.Error as e:
+                print(f"[JOBS] job sweep failed: {e}")
+
+    def _ensure_started(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                t = threading.Thread(target=self._run, name=f"parse-job-{len(self._threads)}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _run(self):
+        while True:
+            job, fn, cleanup = self._queue.get()
+            started = time.time()
+            with self._lock:
+                job["status"] = "running"
+                job["started_at"] = started
+            self._publish(job)
+            JOB_SECONDS.observe(started - job["created_at"], phase="queued")
+            try:
+                outcome, value = "done", fn()
+            except StatementParseError as e:
+                outcome, value = "failed", str(e)
+            except Exception as e:
+                outcome, value = "failed", f"An error occurred while parsing the PDF: {str(e)}"
+            finally:
+                if cleanup is not None:
+                    try:
+                        cleanup()
+                    except Exception:
+                        pass
+            finished = time.time()
+            JOB_SECONDS.observe(finished - started, phase="running")
+            with self._lock:
+                job["status"] = outcome
+                job["result" if outcome == "done" else "error"] = value
+                job["finished_at"] = finished
+                self.counts[outcome] += 1
+            self._publish(job)
+            self._queue.task_done()
+
+parse_jobs = ParseJobQueue(PARSE_JOB_WORKERS, PARSE_JOB_QUEUE_SIZE, PARSE_JOB_TTL, db_path=PARSE_JOB_DB)
+
+def _parse_job(source, cache_key, capture_id, issuer, layout):
+    def run():
+        result = parse_statement(source, capture_id=capture_id, issuer=issuer, layout=layout)
+        cache_statement(cache_key, result)
+        return result
+    return run
 
 # -------------------- API endpoints --------------------
+def statement_response(result):
+    """The parse payload as sent to the client: raw "values" only with ?values=1."""
+    if request.args.get('values', '').lower() in ('1', 'true', 'yes'):
+        return result
+    return {k: v for k, v in result.items() if k != "values"}
+
 @app.route('/api/parse', methods=['POST'])
 def parse_pdf():
     try:
@@ -400,43 +2697,120 @@ def parse_pdf():
         if not file.filename.lower().endswith('.pdf'):
             return jsonify({"error": "Invalid file type. Please upload a PDF file."}), 400
 
-        pdf_bytes = file.read()
-        pdf_file = io.BytesIO(pdf_bytes)
+        with span("upload_read"):
+            source, digest = upload_source(file)
+        capture_id = debug_capture_id(request)
+        layout = request.args.get('layout', '').lower() in ('1', 'true', 'yes') or PARSE_LAYOUT
+        with span("cache_lookup"):
+            cache_key = statement_cache_key(None, digest=digest, issuer=issuer, layout=layout)
+            # a capture request always re-extracts so its artifacts get written
+            cached = parse_cache.get(cache_key) if capture_id is None else None
+        if request.args.get('async', '').lower() in ('1', 'true', 'yes'):
+            return _submit_parse_job(file, source, cache_key, capture_id, cached, issuer, layout)
+        if cached is not None:
+            with span("serialize"):
+                response = jsonify(statement_response(cached))
+            return response, 200
+        try:
+            result = parse_statement(source, capture_id=capture_id, issuer=issuer, layout=layout)
+        except StatementParseError as e:
+            return jsonify({"error": str(e)}), 400
+        cache_statement(cache_key, result)
 
-        text = ""
-        with pdfplumber.open(pdf_file) as pdf:
-            for page in pdf.pages:
-                try:
-                    ptext = page.extract_text() or ""
-                    ptext = ptext.replace('\u200b', ' ').replace('\xa0', ' ')
-                    text += ptext + "\n"
-                except Exception:
-                    continue
+        with span("serialize"):
+            response = jsonify(statement_response(result))
+        return response, 200
 
-        # DEBUG: save extracted text for inspection
-        debug_path = os.path.join(os.getcwd(), "debug_extracted_text.txt")
-        try:
-            with open(debug_path, "w", encoding="utf-8") as f:
-                f.write(text)
-            print(f"[DEBUG] Extracted text saved to: {debug_path}")
-        except Exception as e:
-            print(f"[DEBUG ERROR] Could not write debug file: {e}")
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({"error": f"An error occurred while parsing the PDF: {str(e)}"}), 500
 
-        # also write line map debug (useful when console doesn't show)
+def _submit_parse_job(file, source, cache_key, capture_id, cached, issuer, layout):
+    if cached is not None:
+        job_id = parse_jobs.completed(cached)
+    else:
         try:
-            _build_line_map(text)
-        except Exception:
-            pass
+            job_id = parse_jobs.submit(_parse_job(source, cache_key, capture_id, issuer, layout), cleanup=file.close)
+        except JobQueueFull:
+            response = jsonify({"error": "Too many parse jobs queued. Please retry shortly."})
+            response.headers["Retry-After"] = "5"
+            return response, 429
+        # the job now owns the upload; keep Flask from closing (and deleting) it
+        request.__dict__.pop('files', None)
+    response = jsonify({"job_id": job_id, "status_url": f"/api/jobs/{job_id}"})
+    response.headers["Location"] = f"/api/jobs/{job_id}"
+    return response, 202
 
-        if not text.strip():
-            return jsonify({"error": "Could not extract text from PDF. If this is scanned image PDF, enable OCR."}), 400
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def parse_job_status(job_id):
+    job = parse_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job id"}), 404
+    if "result" in job:
+        job["result"] = statement_response(job["result"])
+    return jsonify(job), 200
 
-        parsed = parse_improved(text)
+@app.route('/api/parse/batch', methods=['POST'])
+def parse_batch():
+    """
+    Parse many PDFs (repeated `files` fields and/or zip archives) and stream
+    one NDJSON record per file as it finishes, followed by a summary record.
+    """
+    files = request.files.getlist('files') or request.files.getlist('file')
+    if not files:
+        return jsonify({"error": "No files provided"}), 400
+    workers = request.args.get('workers', type=int) or BATCH_WORKERS
+    workers = max(1, min(workers, BATCH_WORKERS))
 
-        return jsonify({"data": parsed, "raw_sample": text[:6000]}), 200
+    # Flask closes request.files once the view returns, before the streamed
+    # body is generated, so the generator takes ownership of the uploads.
+    request.__dict__.pop('files', None)
+
+    def generate():
+        try:
+            for record in iter_batch_results(_iter_uploaded_pdfs(files), workers):
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+        finally:
+            for file in files:
+                file.close()
 
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/transactions', methods=['POST'])
+def transactions():
+    """
+    Stream the statement's transaction rows as NDJSON: one row per line
+    (default) or, with ?format=columns, one column-oriented batch per page.
+    """
+    if 'file' not in request.files:
+        return jsonify({"error": "No file provided"}), 400
+    file = request.files['file']
+    if not file.filename or not file.filename.lower().endswith('.pdf'):
+        return jsonify({"error": "Invalid file type. Please upload a PDF file."}), 400
+    fmt = request.args.get('format', 'rows')
+    if fmt not in ('rows', 'columns'):
+        return jsonify({"error": "format must be 'rows' or 'columns'"}), 400
+    source, _ = upload_source(file)
+    # open the PDF before the 200 is sent; the body streams page by page
+    try:
+        with open_pdf(source) as pdf:
+            len(pdf.pages)
     except Exception as e:
-        return jsonify({"error": f"An error occurred while parsing the PDF: {str(e)}"}), 500
+        return jsonify({"error": f"Could not read the PDF: {str(e)}"}), 400
+    records = iter_transactions(source) if fmt == 'rows' else iter_transaction_columns(source)
+    # the upload may be a spooled temp file, which Flask would close (and
+    # delete) before the streamed body is generated
+    request.__dict__.pop('files', None)
+
+    def generate():
+        try:
+            for record in records:
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+        finally:
+            file.close()
+
+    return Response(generate(), mimetype='application/x-ndjson')
 
 @app.route('/debug-text', methods=['POST'])
 def debug_text():
@@ -444,15 +2818,12 @@ def debug_text():
         if 'file' not in request.files:
             return jsonify({"error": "No file provided"}), 400
         file = request.files['file']
-        pdf_bytes = file.read()
-        pdf_file = io.BytesIO(pdf_bytes)
-        text = ""
-        with pdfplumber.open(pdf_file) as pdf:
-            for page in pdf.pages:
-                text += (page.extract_text() or "") + "\n"
+        text = extract_pdf_text(upload_source(file)[0])
         if not text.strip():
             return jsonify({"error": "No text extracted; PDF may be scanned (image)."}), 400
         return jsonify({"text_sample": text[:20000]}), 200
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -466,18 +2837,7 @@ def debug_lines():
         if 'file' not in request.files:
             return jsonify({"error": "No file provided"}), 400
         file = request.files['file']
-        pdf_bytes = file.read()
-        pdf_file = io.BytesIO(pdf_bytes)
-
-        text = ""
-        with pdfplumber.open(pdf_file) as pdf:
-            for page in pdf.pages:
-                try:
-                    ptext = page.extract_text() or ""
-                    ptext = ptext.replace('\u200b', ' ').replace('\xa0', ' ')
-                    text += ptext + "\n"
-                except Exception:
-                    continue
+        text = extract_pdf_text(upload_source(file)[0])
 
         if not text.strip():
             return jsonify({"error": "No text extracted. PDF may be scanned (image)."}), 400
@@ -486,36 +2846,128 @@ def debug_lines():
         # Also return beginning of raw text for context
         return jsonify({"line_map": line_map, "raw_sample": text[:8000]}), 200
 
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 # -------------------- Insights (Gemini) --------------------
-def generate_insights_with_retry(parsed_data, budget_goal, max_retries=3):
+# One keep-alive session is shared by all requests. Identical
+# (parsed_data, budget_goal) pairs are served from a small TTL cache, and
+# concurrent identical calls share a single upstream request. Retries use
+# jittered exponential backoff bounded by an overall deadline, so a worker is
+# never held for longer than GEMINI_DEADLINE seconds.
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com").rstrip("/")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "15"))
+GEMINI_DEADLINE = float(os.getenv("GEMINI_DEADLINE", "30"))
+GEMINI_POOL_SIZE = int(os.getenv("GEMINI_POOL_SIZE", "10"))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "0.5"))
+GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", "8"))
+
+_gemini_session = None
+_gemini_session_lock = threading.Lock()
+_insights_inflight = {}
+_insights_inflight_lock = threading.Lock()
+gemini_stats = {"requests": 0, "retries": 0, "failures": 0, "coalesced": 0}
+
+insights_cache = ResultCache(
+    max_entries=int(os.getenv("INSIGHTS_CACHE_MAX_ENTRIES", "512")),
+    max_bytes=int(os.getenv("INSIGHTS_CACHE_MAX_BYTES", str(4 * 1024 * 1024))),
+    ttl=float(os.getenv("INSIGHTS_CACHE_TTL", "3600")),
+)
+
+def _get_gemini_session():
+    global _gemini_session
+    with _gemini_session_lock:
+        if _gemini_session is None:
+            import requests.adapters
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=GEMINI_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"Content-Type": "application/json"})
+            _gemini_session = session
+        return _gemini_session
+
+def _backoff_delay(attempt, response=None):
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return float(retry_after)
+    return random.uniform(0, min(GEMINI_BACKOFF_MAX, GEMINI_BACKOFF_BASE * (2 ** attempt)))
+
+def _request_insights(parsed_data, budget_goal, max_retries):
+    """Call Gemini; returns (text, ok). Only ok results are cached."""
     api_key = os.getenv("GEMINI_API_KEY", "")
     if not api_key:
-        return "GEMINI_API_KEY not set."
-    api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-exp:generateContent?key={api_key}"
+        return "GEMINI_API_KEY not set.", False
+    import requests
+    api_url = f"{GEMINI_API_BASE}/v1beta/models/{GEMINI_MODEL}:generateContent?key={api_key}"
     system_prompt = "You are a helpful assistant. Provide 2-3 short insights based on the parsed statement data only."
     user_query = f"Statement summary: {json.dumps(parsed_data)}. Budget: {budget_goal}"
     payload = {"system_instruction": {"parts": [{"text": system_prompt}]}, "contents": [{"parts": [{"text": user_query}]}]}
+    session = _get_gemini_session()
+    deadline = time.monotonic() + GEMINI_DEADLINE
     for attempt in range(max_retries):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        response = None
         try:
-            r = requests.post(api_url, json=payload, headers={"Content-Type": "application/json"}, timeout=15)
-            if r.status_code == 200:
-                res = r.json()
+            gemini_stats["requests"] += 1
+            response = session.post(api_url, json=payload, timeout=min(GEMINI_TIMEOUT, remaining))
+            if response.status_code == 200:
+                res = response.json()
                 try:
-                    return res["candidates"][0]["content"]["parts"][0]["text"]
+                    return res["candidates"][0]["content"]["parts"][0]["text"], True
                 except:
-                    return "No candidate content."
-            elif r.status_code >= 500 or r.status_code == 429:
-                time.sleep((2 ** attempt))
-                continue
-            else:
-                return f"API error {r.status_code}"
-        except Exception:
-            time.sleep((2 ** attempt))
-            continue
-    return "Failed to generate insights."
+                    return "No candidate content.", False
+            elif response.status_code < 500 and response.status_code != 429:
+                return f"API error {response.status_code}", False
+        except requests.RequestException:
+            pass
+        if attempt + 1 < max_retries:
+            delay = min(_backoff_delay(attempt, response), deadline - time.monotonic())
+            if delay <= 0:
+                break
+            gemini_stats["retries"] += 1
+            time.sleep(delay)
+    gemini_stats["failures"] += 1
+    return "Failed to generate insights.", False
+
+def _insights_key(parsed_data, budget_goal):
+    canonical = json.dumps({"data": parsed_data, "budget": budget_goal}, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return ":".join([GEMINI_MODEL, hashlib.sha256(canonical.encode("utf-8")).hexdigest()])
+
+def generate_insights_with_retry(parsed_data, budget_goal, max_retries=3):
+    key = _insights_key(parsed_data, budget_goal)
+    cached = insights_cache.get(key)
+    if cached is not None:
+        return cached["insights"]
+
+    with _insights_inflight_lock:
+        future = _insights_inflight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _insights_inflight[key] = future
+    if not leader:
+        gemini_stats["coalesced"] += 1
+        return future.result()
+
+    try:
+        text, ok = _request_insights(parsed_data, budget_goal, max_retries)
+        if ok:
+            insights_cache.put(key, {"insights": text})
+        future.set_result(text)
+        return text
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _insights_inflight_lock:
+            _insights_inflight.pop(key, None)
 
 @app.route('/api/insights', methods=['POST'])
 def get_insights():
@@ -527,12 +2979,140 @@ def get_insights():
             return jsonify({"error": "No extracted data provided"}), 400
         text = generate_insights_with_retry(parsed_data, budget_goal)
         return jsonify({"insights": text}), 200
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/analytics', methods=['POST'])
+def analytics():
+    """
+    Month-by-month spend, utilization, interest trend and budget variance
+    across many parsed statements and/or transaction rows.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        statements = data.get('statements') or []
+        transactions = data.get('transactions') or []
+        if not isinstance(statements, list) or not isinstance(transactions, list):
+            return jsonify({"error": "statements and transactions must be lists"}), 400
+        if not statements and not transactions:
+            return jsonify({"error": "No statements or transactions provided"}), 400
+        with span("analytics"):
+            result = compute_analytics(statements, transactions, data.get('budgetGoal'))
+        return jsonify(result), 200
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def _render_counter(lines, name, help_text, kind, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(tuple(sorted(labels.items())))} {value}")
+
+def render_metrics():
+    lines = []
+    for hist in (REQUEST_SECONDS, STAGE_SECONDS, PAGE_SECONDS, RULE_SECONDS, JOB_SECONDS):
+        lines.extend(hist.render())
+    for cache_name, cache in (("parse", parse_cache), ("page_text", page_cache), ("ocr", ocr_cache), ("insights", insights_cache)):
+        st = cache.stats()
+        _render_counter(lines, f"{cache_name}_cache_requests_total", f"{cache_name} cache lookups by result.", "counter",
+                        [({"result": "hit"}, st["hits"]), ({"result": "disk_hit"}, st["disk_hits"]), ({"result": "miss"}, st["misses"])])
+        _render_counter(lines, f"{cache_name}_cache_evictions_total", f"{cache_name} cache LRU evictions.", "counter", [({}, st["evictions"])])
+        _render_counter(lines, f"{cache_name}_cache_entries", f"{cache_name} cache in-memory entries.", "gauge", [({}, st["entries"])])
+        _render_counter(lines, f"{cache_name}_cache_bytes", f"{cache_name} cache in-memory size.", "gauge", [({}, st["bytes"])])
+    _render_counter(lines, "gemini_requests_total", "Gemini HTTP attempts.", "counter", [({}, gemini_stats["requests"])])
+    _render_counter(lines, "gemini_retries_total", "Gemini retries after 429/5xx/transport errors.", "counter", [({}, gemini_stats["retries"])])
+    _render_counter(lines, "gemini_failures_total", "Insights calls that exhausted their retries.", "counter", [({}, gemini_stats["failures"])])
+    _render_counter(lines, "gemini_coalesced_total", "Insights calls served by another in-flight request.", "counter", [({}, gemini_stats["coalesced"])])
+    _render_counter(lines, "pdf_extract_pool_workers", "Configured PDF extraction processes.", "gauge", [({}, PDF_EXTRACT_WORKERS)])
+    _render_counter(lines, "pdf_extract_pool_started", "1 once the extraction process pool is running.", "gauge", [({}, int(_extract_pool is not None))])
+    _render_counter(lines, "ocr_pages_total", "Blank pages sent to OCR by outcome.", "counter",
+                    [({"result": "done" if k == "pages" else k}, v) for k, v in ocr_stats.items()])
+    _render_counter(lines, "ocr_pool_workers", "Configured OCR processes.", "gauge", [({}, OCR_WORKERS)])
+    _render_counter(lines, "parse_jobs_total", "Async parse jobs by outcome.", "counter",
+                    [({"result": k}, v) for k, v in sorted(parse_jobs.counts.items())])
+    _render_counter(lines, "parse_job_queue_depth", "Async parse jobs waiting for a worker.", "gauge", [({}, parse_jobs.depth())])
+    _render_counter(lines, "debug_capture_files_total", "Debug capture files by outcome.", "counter",
+                    [({"result": "written"}, debug_capture.written), ({"result": "dropped"}, debug_capture.dropped)])
+    return "\n".join(lines) + "\n"
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(dict(parse_cache.stats(), page_text=page_cache.stats(), ocr=ocr_cache.stats())), 200
+
 @app.route('/health', methods=['GET'])
 def health():
     return jsonify({"status": "healthy"}), 200
 
+# -------------------- Server lifecycle --------------------
+# Hooks for a production server (see gunicorn.conf.py): warm_up() runs once
+# before the first request is served, shutdown() as a worker exits.
+def _warm_up_pdf():
+    """A one-page statement-like PDF, built without any PDF library."""
+    stream = (b"BT /F1 9 Tf 36 806 Td 11 TL (Statement Date : 01/01/2024) Tj T* "
+              b"(Total Dues 1,234.00 Minimum Amount Due 100.00) Tj T* (01/01/2024 AMAZON MUMBAI 99.00) Tj ET")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+def warm_up():
+    """
+    Pay the first request's one-off costs up front: pdfminer's lazy imports
+    and font metrics (by extracting text and word rows from a tiny PDF) and
+    a pass of every issuer profile's rules. Caches are not touched and the
+    rule timings it records are discarded. Returns the seconds spent.
+    """
+    started = time.perf_counter()
+    with open_pdf(_warm_up_pdf()) as pdf:
+        page = pdf.pages[0]
+        text = _clean_page_text(page.extract_text())
+        list(_iter_word_rows(page))
+        page_cache_key(page)
+    fingerprint_issuer(text)
+    for profile in ISSUER_PROFILES.values():
+        parse_fields(text, profile)
+    RULE_SECONDS.clear()
+    return time.perf_counter() - started
+
+def shutdown(timeout=30):
+    """
+    Let queued and running async parse jobs finish (up to `timeout`
+    seconds), then stop the extraction and OCR pools. Returns True if no job was cut off.
+    """
+    drained = parse_jobs.drain(timeout)
+    if not drained:
+        print(f"[SHUTDOWN] {parse_jobs.depth()} async parse job(s) still queued after {timeout}s")
+    _reset_extract_pool()
+    _reset_ocr_pool()
+    return drained
+
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        run_batch_cli(sys.argv[2:])
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == 'transactions':
+        run_transactions_cli(sys.argv[2:])
+        sys.exit(0)
     app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 8000)), debug=True)
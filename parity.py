@@ -0,0 +1,146 @@
+# parity.py
+"""
+Parser parity check.
+
+Runs parse_improved over a fixed corpus of statement texts and compares the
+12-field output with the golden outputs in parity_golden.json, which were
+recorded with the original regex parser. The corpus is generated from fixed
+seeds: bench.py's synthetic statements (every layout, several page counts),
+randomised label/number soups in the shapes real extracted text takes, and
+hand-written edge cases. Each golden entry stores the sha256 of its text, so
+a changed generator shows up as a corpus mismatch instead of a parser diff.
+
+Usage:
+  python parity.py             # exits non-zero on any difference
+  python parity.py --update    # re-record the goldens (only for intended output changes)
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+
+import bench
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parity_golden.json")
+
+EDGE_CASES = [
+    "",
+    "   ",
+    "no numbers here",
+    "Card ending 1234",
+    "Total Dues 1,234.00",
+    "Account Summary\n1 2 3 4 5",
+    "Minimum Amount Due\n\n\n 500",
+    "Payment Due Date\n18/12/2024\nTotal Dues Minimum Amount Due\nRs. 2,622.36 Rs. 121.15",
+    "Account Summary\nOpening Balance Payment/Credits Purchase/Debits Finance Charges Total Dues\n"
+    "(1,200.00) 0.00 0 45.10 -",
+    "Credit Limit Available Credit Limit Available Cash Limit\n1,50,000 1,38,734.57 30,000",
+    "Total Amount Due​\xa0₹ 9,99,99,999.00\nMinimum Payment Due : INR 0.00",
+    "Statement Period: 01/03/2024 - 31/03/2024\nPayment Due Date: March 20, 2024",
+    "Annual Percentage Rate (APR) 41.88%\nInterest Charged $12.50\nPurchases $0",
+    "Reward Points 1234 Year 2024\nCard No: 4111 XXXX XXXX 2024",
+]
+
+_LABELS = ["Total Amount Due", "Outstanding Balance", "Amount Payable", "Payments, Credits", "Payments",
+           "Available Credit", "Available Limit", "Credit Access Line", "Minimum Payment Due", "Min Payment",
+           "Interest Charged", "Finance Charges", "Interest", "Purchases", "Purchase / Debits",
+           "Previous Balance", "Opening Balance", "Minimum Amount Due"]
+
+def _money(rng, currency=True):
+    v = rng.choice([rng.randint(0, 999), rng.randint(1000, 99999), rng.randint(100000, 999999), rng.random() * 100000])
+    s = f"{v:,.2f}" if isinstance(v, float) or rng.random() < 0.6 else f"{v:,}"
+    if rng.random() < 0.1:
+        s = f"({s})"
+    return (rng.choice(["", "₹", "Rs. ", "INR ", "$", "", ""]) if currency else "") + s
+
+def _date(rng):
+    return rng.choice([f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.choice([2023, 2024, 25])}",
+                       f"{rng.choice(['Jan', 'March', 'Sep'])} {rng.randint(1, 28)}, 2024",
+                       f"{rng.randint(1, 28)}-{rng.randint(1, 12)}-2024"])
+
+def label_soup(seed):
+    """A statement-shaped text with labels, summary rows and transactions in random order and formats."""
+    rng = random.Random(seed)
+    lines = [rng.choice(["HDFC Bank Credit Card Statement", "Paytm HDFC Bank Select Credit Card Statement", "Statement"])]
+    if rng.random() < 0.8:
+        lines.append(f"Card No: {rng.randint(4000, 4999)} XXXX XXXX {rng.randint(1000, 9999)}")
+    if rng.random() < 0.7:
+        lines.append(rng.choice(["Statement Date", "Statement Period", "Billing Cycle"])
+                     + (" : " + _date(rng) if rng.random() < 0.5 else "")
+                     + (" to " + _date(rng) if rng.random() < 0.3 else ""))
+    if rng.random() < 0.5:
+        lines.append(_date(rng))
+    if rng.random() < 0.8:
+        lines.append(rng.choice(["Payment Due Date Total Dues Minimum Amount Due", "Payment Due Date", "Total Dues Minimum Payment"]))
+        lines.append(" ".join([_date(rng) if rng.random() < 0.7 else "", _money(rng), _money(rng)]))
+    if rng.random() < 0.6:
+        lines.append("Credit Limit Available Credit Limit Available Cash Limit")
+    if rng.random() < 0.6:
+        lines.append(" ".join(_money(rng) for _ in range(3)))
+    if rng.random() < 0.8:
+        lines.append(rng.choice(["Account Summary", "Opening Payment/ Purchase/ Finance", "Opening Balance Payments Purchase", "Summary"]))
+        if rng.random() < 0.5:
+            lines.append("Balance Credits Charges Debits")
+        lines.append(" ".join(_money(rng) for _ in range(rng.randint(2, 5))))
+    for label in _LABELS:
+        if rng.random() < 0.2:
+            lines.append(label + rng.choice([": ", " ", ":\n", "\n"]) + _money(rng))
+    for _ in range(rng.randint(0, 60)):
+        lines.append(f"{_date(rng)} {rng.choice(['AMAZON', 'SWIGGY', 'UBER', 'NEFT PAYMENT', 'FUEL SURCHARGE'])} "
+                     f"{rng.choice(['BANGALORE', 'MUMBAI', ''])} {_money(rng, currency=False)}{rng.choice(['', ' Cr'])}")
+    if rng.random() < 0.3:
+        lines.append("Reward Points 1234 Year 2024")
+    return rng.choice(["\n", "\n", "\n \n", " \n"]).join(lines)
+
+def corpus():
+    """[(name, text), ...] in a fixed order."""
+    items = []
+    for layout in bench.LAYOUTS:
+        for pages in (1, 3):
+            for seed in range(10):
+                text = "".join("\n".join(lines) + "\n" for lines in bench.synthetic_statement(pages, layout, seed))
+                items.append((f"bench:{layout}:{pages}:{seed}", text))
+    items += [(f"soup:{seed}", label_soup(seed)) for seed in range(600)]
+    items += [(f"edge:{i}", text) for i, text in enumerate(EDGE_CASES)]
+    return items
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def run(parse, golden):
+    """Compare parse(text) with the goldens; returns the list of differences."""
+    diffs = []
+    for name, text in corpus():
+        expected = golden.get(name)
+        if expected is None or expected["sha256"] != _digest(text):
+            diffs.append((name, "corpus text changed or missing from the goldens"))
+            continue
+        got = parse(text)
+        fields = {k: (expected["fields"][k], got.get(k)) for k in expected["fields"] if got.get(k) != expected["fields"][k]}
+        if fields:
+            diffs.append((name, fields))
+    return diffs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check parse_improved against the golden outputs.")
+    parser.add_argument("--update", action="store_true", help="re-record parity_golden.json from the current parser")
+    args = parser.parse_args()
+
+    import main
+    if args.update:
+        golden = {name: {"sha256": _digest(text), "fields": main.parse_improved(text)} for name, text in corpus()}
+        with open(GOLDEN_PATH, "w") as f:
+            json.dump(golden, f, indent=0, sort_keys=True, ensure_ascii=False)
+            f.write("\n")
+        print(f"recorded {len(golden)} goldens in {GOLDEN_PATH}")
+        sys.exit(0)
+
+    with open(GOLDEN_PATH) as f:
+        golden = json.load(f)
+    diffs = run(main.parse_improved, golden)
+    for name, detail in diffs[:20]:
+        print(f"DIFF {name}: {detail}")
+    print(f"{len(golden) - len(diffs)}/{len(golden)} texts match")
+    sys.exit(1 if diffs else 0)
@@ -192,6 +192,8 @@ function App() {
                 className="w-full px-4 py-2 bg-gray-50 dark:bg-gray-700 border border-gray-300 dark:border-gray-600 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent text-gray-900 dark:text-white"
               >
                 <option value="">Choose an issuer...</option>
+                <option value="AUTO">Auto-detect</option>
+                <option value="HDFC Bank">HDFC Bank</option>
                 <option value="CFPB Sample (Working)">CFPB Sample (Working)</option>
                 <option value="Chase (Demo)">Chase (Demo)</option>
                 <option value="American Express (Demo)">American Express (Demo)</option>